@@ -0,0 +1,257 @@
+#!/usr/bin/env python3
+"""
+End-to-end latency benchmark
+
+Starts the fake LLM/TTS services and the app on local ports, drives full
+discussions from N concurrent clients and reports per-endpoint latency
+percentiles, turns per second and server CPU/RSS.
+
+    python benchmarks/e2e.py --clients 8 --turns 10
+    python benchmarks/e2e.py --llm-latency lognormal:1.2,0.5 --tts-latency 0 --json result.json
+
+Extra app settings are passed as --env NAME=VALUE (e.g. --env SPEAKER_SELECTOR=llm).
+CPU and RSS are read from /proc and are only reported on Linux.
+"""
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+import pathlib
+import tempfile
+import subprocess
+from collections import defaultdict
+
+import httpx
+
+ROOT = pathlib.Path(__file__).resolve().parent.parent
+
+
+def percentile(values: list, q: float) -> float:
+    """Nearest-rank percentile of values"""
+    ordered = sorted(values)
+    index = max(int(round(q / 100 * len(ordered) + 0.5)) - 1, 0)
+    return ordered[min(index, len(ordered) - 1)]
+
+
+class ProcessSampler:
+    """Samples CPU time and resident memory of a process from /proc"""
+
+    def __init__(self, pid: int):
+        self.pid = pid
+        self.ticks = os.sysconf("SC_CLK_TCK") if hasattr(os, "sysconf") else 100
+        self.max_rss = 0
+        self.start_cpu = self.cpu_seconds()
+
+    def cpu_seconds(self):
+        try:
+            fields = pathlib.Path(f"/proc/{self.pid}/stat").read_text().rsplit(")", 1)[1].split()
+        except OSError:
+            return None
+        # utime and stime, fields 14 and 15 of /proc/<pid>/stat
+        return (int(fields[11]) + int(fields[12])) / self.ticks
+
+    def rss_bytes(self):
+        try:
+            for line in pathlib.Path(f"/proc/{self.pid}/status").read_text().splitlines():
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+        except OSError:
+            return None
+        return None
+
+    async def run(self, interval: float = 0.2):
+        while True:
+            rss = self.rss_bytes()
+            if rss:
+                self.max_rss = max(self.max_rss, rss)
+            await asyncio.sleep(interval)
+
+
+class Recorder:
+    """Latency samples and errors per endpoint"""
+
+    def __init__(self):
+        self.samples = defaultdict(list)
+        self.errors = defaultdict(int)
+
+    async def request(self, client: httpx.AsyncClient, name: str, method: str, url: str, **kwargs):
+        started = time.perf_counter()
+        try:
+            response = await client.request(method, url, **kwargs)
+            response.raise_for_status()
+        except httpx.HTTPError:
+            self.errors[name] += 1
+            return None
+        self.samples[name].append(time.perf_counter() - started)
+        return response.json()
+
+
+async def run_client(index: int, args, recorder: Recorder, stats: dict):
+    """One user: create a discussion, initialize it and play its turns"""
+    async with httpx.AsyncClient(base_url=args.app_url, timeout=args.timeout) as client:
+        discussion = await recorder.request(
+            client, "POST /discussions", "POST", "/discussions",
+            json={"topic": f"Benchmark topic {index}: should cities ban cars?"}
+        )
+        if not discussion:
+            return
+        base = f"/discussions/{discussion['id']}"
+        if not await recorder.request(client, "POST /init", "POST", f"{base}/init"):
+            return
+        if args.mode != "auto":
+            await recorder.request(client, "POST /mode", "POST", f"{base}/mode", json={"mode": args.mode})
+
+        for turn in range(args.turns):
+            if args.user_message_every and turn and turn % args.user_message_every == 0:
+                await recorder.request(
+                    client, "POST /user_message", "POST", f"{base}/user_message",
+                    json={"content": "@Speaker_1 can you back that up?", "voice_id": args.user_voice or None}
+                )
+            result = await recorder.request(client, "POST /next_turn", "POST", f"{base}/next_turn")
+            if result is None or result.get("status") != "ongoing":
+                break
+            stats["turns"] += 1
+            if args.think_time:
+                await asyncio.sleep(random.uniform(0, 2 * args.think_time))
+
+
+async def wait_ready(url: str, timeout: float = 30.0):
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient(timeout=2.0) as client:
+        while time.monotonic() < deadline:
+            try:
+                await client.get(url)
+                return
+            except httpx.HTTPError:
+                await asyncio.sleep(0.2)
+    raise RuntimeError(f"{url} did not come up within {timeout:.0f}s")
+
+
+def start_services(args, workdir: pathlib.Path):
+    """Start fake services and app, returning both processes"""
+    fake_env = {
+        **os.environ,
+        "FAKE_LLM_LATENCY": args.llm_latency,
+        "FAKE_LLM_TOKEN_DELAY": args.token_delay,
+        "FAKE_TTS_LATENCY": args.tts_latency
+    }
+    fake = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "fake_services:app", "--port", str(args.fake_port), "--log-level", "warning"],
+        cwd=ROOT / "benchmarks", env=fake_env
+    )
+
+    fake_url = f"http://127.0.0.1:{args.fake_port}"
+    app_env = {
+        **os.environ,
+        "OPENAI_API_KEY": "sk-benchmark",
+        "OPENAI_BASE_URL": f"{fake_url}/v1",
+        "FISH_AUDIO_API_KEY": "benchmark" if args.tts else "",
+        "FISH_AUDIO_BASE_URL": fake_url,
+        "DATABASE_PATH": str(workdir / "benchmark.db"),
+        "AUDIO_STORE_DIR": str(workdir / "audio_store"),
+        "TTS_CACHE_DIR": str(workdir / "tts_cache"),
+        "LLM_CACHE_MODE": "passthrough"
+    }
+    for setting in args.env:
+        name, _, value = setting.partition("=")
+        app_env[name] = value
+    log = open(workdir / "app.log", "wb")
+    app = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(args.app_port), "--log-level", "warning"],
+        cwd=ROOT / "src", env=app_env, stdout=log, stderr=subprocess.STDOUT
+    )
+    return fake, app
+
+
+def report(recorder: Recorder, stats: dict, elapsed: float, sampler: ProcessSampler, server_stats: dict) -> dict:
+    """Print result table and return it as a dict"""
+    result = {"elapsed_seconds": elapsed, "turns": stats["turns"], "endpoints": {}}
+    print(f"\n{'endpoint':<22}{'count':>7}{'errors':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for name in sorted(set(recorder.samples) | set(recorder.errors)):
+        samples = recorder.samples[name]
+        row = {"count": len(samples), "errors": recorder.errors[name]}
+        if samples:
+            row.update({f"p{q}_ms": percentile(samples, q) * 1000 for q in (50, 95, 99)})
+        result["endpoints"][name] = row
+        print(
+            f"{name:<22}{row['count']:>7}{row['errors']:>8}"
+            + "".join(f"{row.get(f'p{q}_ms', float('nan')):>10.1f}" for q in (50, 95, 99))
+        )
+
+    result["turns_per_second"] = stats["turns"] / elapsed if elapsed else 0.0
+    print(f"\nturns: {stats['turns']} in {elapsed:.1f}s ({result['turns_per_second']:.2f} turns/s)")
+
+    cpu = sampler.cpu_seconds()
+    if cpu is not None:
+        result["server_cpu_seconds"] = cpu - sampler.start_cpu
+        result["server_cpu_percent"] = 100 * result["server_cpu_seconds"] / elapsed
+        result["server_max_rss_mb"] = sampler.max_rss / 2**20
+        print(
+            f"server: {result['server_cpu_seconds']:.2f}s CPU ({result['server_cpu_percent']:.0f}%), "
+            f"max RSS {result['server_max_rss_mb']:.0f} MB"
+        )
+    result["server_stats"] = server_stats
+    return result
+
+
+async def benchmark(args):
+    with tempfile.TemporaryDirectory(prefix="brainstormer-bench-") as tmp:
+        workdir = pathlib.Path(tmp)
+        fake, app = start_services(args, workdir)
+        try:
+            await wait_ready(f"http://127.0.0.1:{args.fake_port}/calls")
+            await wait_ready(f"{args.app_url}/stats")
+            sampler = ProcessSampler(app.pid)
+            sampler_task = asyncio.create_task(sampler.run())
+
+            recorder = Recorder()
+            stats = {"turns": 0}
+            started = time.perf_counter()
+            await asyncio.gather(*[run_client(i, args, recorder, stats) for i in range(args.clients)])
+            elapsed = time.perf_counter() - started
+            sampler_task.cancel()
+
+            async with httpx.AsyncClient(timeout=10) as client:
+                server_stats = (await client.get(f"{args.app_url}/stats")).json()
+            result = report(recorder, stats, elapsed, sampler, server_stats)
+        finally:
+            app.terminate()
+            fake.terminate()
+            app.wait()
+            fake.wait()
+            if args.keep_log:
+                (workdir / "app.log").replace(args.keep_log)
+
+    if args.json:
+        pathlib.Path(args.json).write_text(json.dumps(result, indent=2))
+        print(f"📄 Results written to {args.json}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, default=4, help="concurrent simulated users")
+    parser.add_argument("--turns", type=int, default=8, help="turns per discussion")
+    parser.add_argument("--mode", default="auto", help="discussion mode set after /init")
+    parser.add_argument("--user-message-every", type=int, default=3, help="send a user message every N turns, 0 never")
+    parser.add_argument("--user-voice", default="", help="voice id for user messages, synthesizes them when set")
+    parser.add_argument("--think-time", type=float, default=0.0, help="mean pause between turns, seconds")
+    parser.add_argument("--llm-latency", default="lognormal:0.6,0.4", help="LLM time to first token spec")
+    parser.add_argument("--token-delay", default="0.01", help="delay between streamed LLM chunks spec")
+    parser.add_argument("--tts-latency", default="lognormal:0.8,0.3", help="TTS request latency spec")
+    parser.add_argument("--no-tts", dest="tts", action="store_false", help="run without Fish Audio")
+    parser.add_argument("--env", action="append", default=[], metavar="NAME=VALUE", help="extra app setting")
+    parser.add_argument("--app-port", type=int, default=8765)
+    parser.add_argument("--fake-port", type=int, default=8766)
+    parser.add_argument("--timeout", type=float, default=120.0, help="request timeout, seconds")
+    parser.add_argument("--json", help="also write results to this file")
+    parser.add_argument("--keep-log", help="copy the app log to this file")
+    args = parser.parse_args()
+    args.app_url = f"http://127.0.0.1:{args.app_port}"
+    asyncio.run(benchmark(args))
+
+
+if __name__ == "__main__":
+    main()
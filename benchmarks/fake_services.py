@@ -0,0 +1,140 @@
+"""
+Fake Services - Local stand-ins for the OpenAI chat API and Fish Audio TTS
+
+Run with uvicorn; latencies are configured through environment variables
+holding a latency spec (see parse_latency):
+
+    FAKE_LLM_LATENCY      Time to first token of chat completions
+    FAKE_LLM_TOKEN_DELAY  Delay between streamed chunks
+    FAKE_TTS_LATENCY      Time to synthesize one request
+"""
+import os
+import re
+import json
+import math
+import random
+import asyncio
+import itertools
+
+import msgpack
+from fastapi import FastAPI, Request, Response
+from fastapi.responses import StreamingResponse
+
+# One silent MPEG-1 Layer III frame (128 kbps, 44.1 kHz), 417 bytes
+MP3_FRAME = b"\xff\xfb\x90\xc0" + b"\x00" * 413
+
+
+def parse_latency(spec: str):
+    """
+    Build a latency sampler in seconds from a spec
+
+    Specs: "0.5" or "const:0.5", "uniform:0.2,0.8",
+    "normal:mean,stddev", "lognormal:median,sigma"
+    """
+    kind, _, params = spec.partition(":")
+    if not params:
+        kind, params = "const", kind
+    values = [float(value) for value in params.split(",")]
+    if kind == "const":
+        return lambda: values[0]
+    if kind == "uniform":
+        return lambda: random.uniform(values[0], values[1])
+    if kind == "normal":
+        return lambda: max(random.gauss(values[0], values[1]), 0.0)
+    if kind == "lognormal":
+        return lambda: random.lognormvariate(math.log(values[0]), values[1])
+    raise ValueError(f"Unknown latency distribution: {spec}")
+
+
+llm_latency = parse_latency(os.getenv("FAKE_LLM_LATENCY", "lognormal:0.6,0.4"))
+token_delay = parse_latency(os.getenv("FAKE_LLM_TOKEN_DELAY", "0.01"))
+tts_latency = parse_latency(os.getenv("FAKE_TTS_LATENCY", "lognormal:0.8,0.3"))
+
+app = FastAPI(title="Fake LLM and TTS services")
+calls = {"chat": 0, "tts": 0}
+reply_ids = itertools.count(1)
+
+
+def speaker_names(messages: list) -> list:
+    """Speaker names listed in the prompt roster, or in a combined-mode instruction"""
+    text = "\n".join(m["content"] for m in messages)
+    names = re.findall(r"^- ([\w\-]+):", text, re.MULTILINE)
+    if not names:
+        match = re.search(r"one of: ([^>\"]+)", text)
+        names = [name.strip() for name in match.group(1).split(",")] if match else []
+    return names or ["Speaker"]
+
+
+def reply_for(body: dict) -> str:
+    """Plausible reply text for the kind of request the app makes"""
+    messages = body["messages"]
+    last = messages[-1]["content"]
+    names = speaker_names(messages)
+    reply = (
+        f"(excited) Reply {next(reply_ids)} takes a clear position on this. "
+        f"@{random.choice(names)}, what evidence would change your mind? "
+        "Either way, the argument deserves a closer look!"
+    )
+    if (body.get("response_format") or {}).get("type") == "json_object":
+        if "discussion personas" in last:
+            count = int(re.search(r"generate (\d+) most suitable", last).group(1))
+            return json.dumps({"roles": [
+                {"name": f"Speaker {i + 1}", "stance": f"Stance {i + 1}", "personality": "Direct, curious"}
+                for i in range(count)
+            ]})
+        return json.dumps({"speaker": random.choice(names), "reply": reply})
+    if last.rstrip().endswith("Selected speaker:"):
+        return random.choice(names)
+    if "Update the summary" in last:
+        return "The speakers disagree about the evidence and keep asking each other for sources."
+    return reply
+
+
+@app.post("/v1/chat/completions")
+async def chat_completions(request: Request):
+    calls["chat"] += 1
+    body = await request.json()
+    text = reply_for(body)
+    prompt_tokens = sum(len(m["content"]) for m in body["messages"]) // 4
+    usage = {
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": len(text) // 4,
+        "total_tokens": prompt_tokens + len(text) // 4
+    }
+    await asyncio.sleep(llm_latency())
+
+    if not body.get("stream"):
+        return {
+            "id": "fake", "object": "chat.completion", "created": 0, "model": body["model"],
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": "stop"}],
+            "usage": usage
+        }
+
+    async def chunks():
+        for i in range(0, len(text), 8):
+            chunk = {
+                "id": "fake", "object": "chat.completion.chunk", "created": 0, "model": body["model"],
+                "choices": [{"index": 0, "delta": {"content": text[i:i + 8]}, "finish_reason": None}]
+            }
+            yield f"data: {json.dumps(chunk)}\n\n"
+            await asyncio.sleep(token_delay())
+        final = {"id": "fake", "object": "chat.completion.chunk", "created": 0, "model": body["model"],
+                 "choices": [], "usage": usage}
+        yield f"data: {json.dumps(final)}\n\n"
+        yield "data: [DONE]\n\n"
+
+    return StreamingResponse(chunks(), media_type="text/event-stream")
+
+
+@app.post("/v1/tts")
+async def tts(request: Request):
+    calls["tts"] += 1
+    body = msgpack.unpackb(await request.body())
+    await asyncio.sleep(tts_latency())
+    # About 26 ms of audio per frame, one frame per two characters of text
+    return Response(content=MP3_FRAME * max(len(body["text"]) // 2, 1), media_type="audio/mpeg")
+
+
+@app.get("/calls")
+async def get_calls():
+    return calls
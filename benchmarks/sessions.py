@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+Session footprint benchmark
+
+Builds N discussion sessions (MultiAgentDiscussion with generated-style
+roles, initialized on a topic) and reports construction time and resident
+memory per session, for the slim Persona agents and for the AutoGen
+ConversableAgent agents discussions used before.
+
+    python benchmarks/sessions.py --sessions 500
+    python benchmarks/sessions.py --sessions 200 --roles 4 --json result.json
+
+Each variant runs in its own process so memory is measured from a clean
+start. RSS is read from /proc and is only reported on Linux.
+"""
+import os
+import sys
+import gc
+import json
+import time
+import argparse
+import pathlib
+import subprocess
+
+ROOT = pathlib.Path(__file__).resolve().parent.parent
+VARIANTS = ("slim", "autogen")
+
+
+def rss_bytes():
+    try:
+        for line in pathlib.Path("/proc/self/status").read_text().splitlines():
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) * 1024
+    except OSError:
+        return None
+    return None
+
+
+def percentile(values: list, q: float) -> float:
+    """Nearest-rank percentile of values"""
+    ordered = sorted(values)
+    index = max(int(round(q / 100 * len(ordered) + 0.5)) - 1, 0)
+    return ordered[min(index, len(ordered) - 1)]
+
+
+def autogen_agents(roles: list) -> list:
+    """Agents as MultiAgentDiscussion built them with AutoGen"""
+    from autogen import ConversableAgent
+    config = {
+        "config_list": [{
+            "model": os.getenv("OPENAI_MODEL", "gpt-4o-mini"),
+            "api_key": os.getenv("OPENAI_API_KEY"),
+        }],
+        "temperature": 0.8
+    }
+    return [
+        ConversableAgent(name=role["name"], system_message=role["system_message"], llm_config=config, human_input_mode="NEVER")
+        for role in roles
+    ]
+
+
+def measure(variant: str, sessions: int, num_roles: int) -> dict:
+    """Build sessions in this process and return timings and memory growth"""
+    sys.path.insert(0, str(ROOT / "src"))
+    os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+    from agents import MultiAgentDiscussion
+    from role_generator import build_role
+
+    def roles_for(index: int) -> list:
+        return [
+            build_role({
+                "name": f"Speaker {index}-{i}",
+                "stance": f"Stance {i} on topic {index}",
+                "personality": "Direct, curious"
+            })
+            for i in range(num_roles)
+        ]
+
+    # Warm up imports and lazily created shared state outside the measurement
+    warmup = MultiAgentDiscussion(custom_roles=roles_for(-1))
+    if variant == "autogen":
+        warmup.agents = autogen_agents(roles_for(-1))
+    del warmup
+
+    inputs = [roles_for(i) for i in range(sessions)]
+    gc.collect()
+    rss_before = rss_bytes()
+
+    kept = []
+    seconds = []
+    for index, roles in enumerate(inputs):
+        started = time.perf_counter()
+        discussion = MultiAgentDiscussion(custom_roles=roles)
+        if variant == "autogen":
+            discussion.agents = autogen_agents(roles)
+        discussion.init_discussion(f"Benchmark topic {index}")
+        seconds.append(time.perf_counter() - started)
+        kept.append(discussion)
+
+    gc.collect()
+    rss_after = rss_bytes()
+    result = {
+        "variant": variant,
+        "sessions": sessions,
+        "roles": num_roles,
+        "construct_mean_ms": 1000 * sum(seconds) / len(seconds),
+        "construct_p50_ms": 1000 * percentile(seconds, 50),
+        "construct_p99_ms": 1000 * percentile(seconds, 99)
+    }
+    if rss_before is not None and rss_after is not None:
+        result["rss_per_session_kb"] = (rss_after - rss_before) / sessions / 1024
+        result["rss_total_mb"] = rss_after / 2**20
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=300, help="sessions built per variant")
+    parser.add_argument("--roles", type=int, default=3, help="roles per session")
+    parser.add_argument("--variant", choices=VARIANTS, action="append", help="run only these variants")
+    parser.add_argument("--json", help="also write results to this file")
+    parser.add_argument("--worker", choices=VARIANTS, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(measure(args.worker, args.sessions, args.roles)))
+        return
+
+    results = []
+    for variant in args.variant or VARIANTS:
+        output = subprocess.run(
+            [sys.executable, __file__, "--worker", variant, "--sessions", str(args.sessions), "--roles", str(args.roles)],
+            check=True, capture_output=True, text=True
+        ).stdout
+        results.append(json.loads(output.strip().splitlines()[-1]))
+
+    print(f"\n{'variant':<10}{'sessions':>10}{'mean ms':>10}{'p50 ms':>10}{'p99 ms':>10}{'KB/session':>12}")
+    for result in results:
+        print(
+            f"{result['variant']:<10}{result['sessions']:>10}{result['construct_mean_ms']:>10.3f}"
+            f"{result['construct_p50_ms']:>10.3f}{result['construct_p99_ms']:>10.3f}"
+            f"{result.get('rss_per_session_kb', float('nan')):>12.1f}"
+        )
+
+    if args.json:
+        pathlib.Path(args.json).write_text(json.dumps(results, indent=2))
+        print(f"📄 Results written to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,69 @@
-from autogen import ConversableAgent
 from duckduckgo_search import DDGS
 import os
+import re
+import sys
+import json
+import time
+import asyncio
+import logging
 from typing import Callable
 
+from llm import LLMResponse, count_tokens, get_backend, truncate_tokens
+from metrics import stage_seconds, timed
+
+logger = logging.getLogger(__name__)
+
+# Speaker selection in auto mode: "heuristic" decides locally and asks the LLM
+# only when the choice is ambiguous, "llm" always asks the LLM
+SPEAKER_SELECTOR = os.getenv("SPEAKER_SELECTOR", "heuristic")
+
+# How often each selection path fired, across all discussions
+selection_stats = {
+    "mention": 0,  # Answered an @Name mention
+    "user_reply": 0,  # Answered the user
+    "balance": 0,  # Least frequent, then least recent speaker
+    "llm": 0  # Orchestrator LLM call
+}
+
+# Turns before a discussion ends
+DISCUSSION_MAX_TURNS = int(os.getenv("DISCUSSION_MAX_TURNS", 30))
+# Latest messages always quoted verbatim in prompts, older ones are folded into a running summary
+HISTORY_WINDOW = int(os.getenv("HISTORY_WINDOW", 8))
+# Messages that must fall out of the window before the summary is updated
+SUMMARY_BATCH = int(os.getenv("SUMMARY_BATCH", 4))
+SUMMARY_MAX_WORDS = 200
+
+# Token budgets of the summary and history part of each prompt
+SELECTION_CONTEXT_TOKENS = int(os.getenv("SELECTION_CONTEXT_TOKENS", 600))
+REPLY_CONTEXT_TOKENS = int(os.getenv("REPLY_CONTEXT_TOKENS", 1500))
+# Call type -> (history budget, longest quote of a single message)
+CONTEXT_BUDGETS = {
+    "selection": (SELECTION_CONTEXT_TOKENS, 60),
+    "reply": (REPLY_CONTEXT_TOKENS, None),
+    "combined": (REPLY_CONTEXT_TOKENS, None)
+}
+
+# Assembled history size per call type, across all discussions
+context_stats = {}
+
+# Background summarizer counters, across all discussions
+summary_stats = {"runs": 0, "failures": 0, "folded_messages": 0, "prompt_tokens": 0, "completion_tokens": 0}
+
+# auto: select speaker, then generate its reply; round_robin: take turns;
+# combined: one structured call selects the speaker and writes the reply;
+# parallel: every agent drafts at once, the best draft is picked locally
+DISCUSSION_MODES = ("auto", "round_robin", "combined", "parallel")
+
+# Latency and token cost of turns per discussion mode, across all discussions
+turn_stats = {}
+
+# Sampling temperature of agent replies
+REPLY_TEMPERATURE = 0.8
+
 # Search tool functions
 def search_philosophy(query: str) -> str:
     """Search philosophy related content"""
-    print(f"🔍 Philosopher searching: {query}")
+    logger.info("Philosopher searching: %s", query)
     ddgs = DDGS()
     search_query = f"{query} site:plato.stanford.edu OR site:iep.utm.edu"
     try:
@@ -23,7 +80,7 @@ def search_philosophy(query: str) -> str:
 
 def search_science(query: str) -> str:
     """Search science related content"""
-    print(f"🔍 Scientist searching: {query}")
+    logger.info("Scientist searching: %s", query)
     ddgs = DDGS()
     search_query = f"{query} site:arxiv.org OR site:nature.com OR site:science.org"
     try:
@@ -40,7 +97,7 @@ def search_science(query: str) -> str:
 
 def search_art(query: str) -> str:
     """Search art related content"""
-    print(f"🔍 Artist searching: {query}")
+    logger.info("Artist searching: %s", query)
     ddgs = DDGS()
     search_query = f"{query} site:artsy.net OR site:moma.org OR art"
     try:
@@ -55,66 +112,29 @@ def search_art(query: str) -> str:
     except Exception as e:
         return f"Search error: {str(e)}"
 
-class MultiAgentDiscussion:
-    """Multi-agent discussion system"""
+class Persona:
+    """
+    Discussion participant: a name and the system message it speaks with
 
-    def __init__(self, message_callback: Callable = None, discussion_mode: str = "auto", custom_roles: list = None):
-        """
-        Initialize discussion system
+    Holds no LLM client or config of its own; replies of every persona go
+    through the shared backend (llm.get_backend) with the discussion's
+    settings, so a session costs little more than its role texts.
+    """
 
-        Args:
-            message_callback: Message callback function for real-time message push (sync_callback)
-            discussion_mode: Discussion mode - "auto" (intelligent selection), "round_robin" (take turns)
-            custom_roles: Custom roles list, if provided use these instead of default roles
-        """
-        self.message_callback = message_callback
-        self.message_history = []
-        self.discussion_mode = discussion_mode
-        self.custom_roles = custom_roles
+    __slots__ = ("name", "system_message")
 
-        # OpenAI Configuration - Used by agents
-        config = {
-            "config_list": [{
-                "model": os.getenv("OPENAI_MODEL", "gpt-4o-mini"),
-                "api_key": os.getenv("OPENAI_API_KEY"),
-            }],
-            "temperature": 0.8
-        }
-
-        # Manager Configuration - Does not include tools
-        manager_config = {
-            "config_list": [{
-                "model": os.getenv("OPENAI_MODEL", "gpt-4o-mini"),
-                "api_key": os.getenv("OPENAI_API_KEY"),
-            }],
-            "temperature": 0.7
-        }
+    def __init__(self, name: str, system_message: str):
+        self.name = name
+        self.system_message = system_message
 
-        # Create agents
-        def create_agent(name, system_message):
-            agent = ConversableAgent(
-                name=name,
-                system_message=system_message,
-                llm_config=config,
-                human_input_mode="NEVER"
-            )
-            return agent
+    def __repr__(self):
+        return f"Persona({self.name!r})"
 
-        # Create agents based on whether custom roles are provided
-        if self.custom_roles:
-            # Use dynamically generated roles
-            self.agents = []
-            for role in self.custom_roles:
-                agent = create_agent(
-                    role["name"],
-                    role["system_message"]
-                )
-                self.agents.append(agent)
-        else:
-            # Use default three roles
-            self.philosopher = create_agent(
-                "Philosopher",
-                """You are a philosopher.
+# Personas used when a discussion has no generated roles
+DEFAULT_PERSONAS = (
+    Persona(
+        "Philosopher",
+        """You are a philosopher.
 
 Important rules:
 1. When others share their views, you should:
@@ -126,11 +146,10 @@ Important rules:
 4. Think deeply about the essence of issues from a philosophical perspective
 
 Style: Socratic questioning, challenge assumptions, quote Plato, Kant, Nietzsche, etc."""
-            )
-
-            self.scientist = create_agent(
-                "Scientist",
-                """You are a scientist.
+    ),
+    Persona(
+        "Scientist",
+        """You are a scientist.
 
 Important rules:
 1. When others share their views, you should:
@@ -142,11 +161,10 @@ Important rules:
 4. When hearing philosophical or artistic views, think about how to verify or challenge them from a scientific angle
 
 Style: Empiricism, require measurable evidence, focus on logic and data"""
-            )
-
-            self.artist = create_agent(
-                "Artist",
-                """You are an artist.
+    ),
+    Persona(
+        "Artist",
+        """You are an artist.
 
 Important rules:
 1. When others share their views, you should:
@@ -158,16 +176,51 @@ Important rules:
 4. Respond to scientific and philosophical views from an emotional and intuitive angle
 
 Style: Emotional, intuitive, focus on experience and emotion, quote Picasso, Van Gogh, Da Vinci, etc."""
-            )
+    )
+)
 
-            self.agents = [self.philosopher, self.scientist, self.artist]
+class MultiAgentDiscussion:
+    """Multi-agent discussion system"""
+
+    def __init__(self, message_callback: Callable = None, discussion_mode: str = "auto", custom_roles: list = None):
+        """
+        Initialize discussion system
+
+        Args:
+            message_callback: Message callback function for real-time message push (sync_callback)
+            discussion_mode: Discussion mode - "auto" (intelligent selection), "round_robin" (take turns)
+            custom_roles: Custom roles list, if provided use these instead of default roles
+        """
+        self.message_callback = message_callback
+        self.message_history = []
+        self.discussion_mode = discussion_mode
+        self.custom_roles = custom_roles
+
+        self.temperature = REPLY_TEMPERATURE
+
+        if self.custom_roles:
+            # Use dynamically generated roles
+            self.agents = [Persona(role["name"], role["system_message"]) for role in self.custom_roles]
+        else:
+            # Use default three roles, shared by all discussions
+            self.agents = list(DEFAULT_PERSONAS)
 
     def init_discussion(self, topic: str):
         """Initialize discussion and set topic and context"""
         self.topic = topic
         self.current_turn = 0
-        self.max_turns = 12
-        self.discussion_history = []
+        self.max_turns = DISCUSSION_MAX_TURNS
+        self.discussion_history = []  # System message followed by the messages not yet summarized
+        self.summary = ""  # Running summary of messages dropped from discussion_history
+        self._summary_task = None
+        self._summary_revision = 0  # Revision the pending summary update was started at
+        self._usage = self._new_usage()
+        self._prompt_cache = {}  # Assembled static prompt parts, identical for the whole discussion
+        self._context_start = {}  # Call type -> oldest message quoted in its last prompt
+        self._pending_drafts = None  # Drafts behind the last prepared parallel turn
+        self._pending_stats = None  # Stats of the last prepared turn, recorded when it is committed
+        self._spare_drafts = None  # (revision, {agent_name: draft}) reusable while history is unchanged
+        self.revision = 0  # Bumped on every history change, used to detect stale speculative turns
 
         initial_context = f"""Let's discuss: {topic}
 
@@ -180,21 +233,13 @@ Everyone will share perspectives and challenge each other. Keep responses brief
 
         return initial_context
 
-    def _select_next_speaker(self):
+    async def _select_next_speaker(self):
         """
         Intelligently select next speaker
 
         Returns:
             Selected agent
         """
-        from openai import OpenAI
-
-        # Build agents information
-        agents_info = "\n".join([
-            f"- {agent.name}: {agent.system_message[:100]}..."
-            for agent in self.agents
-        ])
-
         # Count recent speech counts
         speaker_count = {}
         for agent in self.agents:
@@ -205,34 +250,19 @@ Everyone will share perspectives and challenge each other. Keep responses brief
 
         speaker_stats = ", ".join([f"{name}: {count}" for name, count in speaker_count.items()])
 
-        # Build recent conversation history
-        recent_history = ""
-        last_speaker = None
-        for msg in self.discussion_history[-8:]:  # Last 8 conversation rounds, increase context
-            if msg["role"] != "system":
-                recent_history += f"{msg['agent']}: {msg['content'][:200]}...\n"
-                last_speaker = msg["agent"]
-
         # Check if last speaker was user
-        user_just_spoke = (last_speaker == "You")
+        recent = self._recent_messages()
+        user_just_spoke = bool(recent) and recent[-1]["agent"] == "You"
 
         # Build selection prompt - emphasize natural conversation flow
         user_priority_note = ""
         if user_just_spoke:
             user_priority_note = "\n**CRITICAL**: The user (\"You\") just spoke. You MUST select someone to respond to the user's message. The selected speaker should acknowledge and reply to what the user said."
 
-        selection_prompt = f"""Based on the following discussion, select who should speak next to create the most natural, engaging conversation.
+        # Static instructions first so the provider can cache the prompt prefix
+        system_prompt = self._cached_prompt("selection", lambda: f"""{self._frame()}
 
-Topic: {self.topic}
-
-Available speakers:
-{agents_info}
-
-Recent conversation (latest messages):
-{recent_history}
-
-Recent speaking frequency (last 10 turns): {speaker_stats}
-{user_priority_note}
+Based on the discussion, select who should speak next to create the most natural, engaging conversation.
 
 Rules for selection:
 1. Choose whoever would most naturally respond to what was just said
@@ -242,21 +272,27 @@ Rules for selection:
 5. It's OK (even encouraged!) for someone to speak 2-3 times in a row if the conversation demands it
 6. Prioritize natural conversation flow over equal distribution
 
-Respond with ONLY the speaker's name, nothing else.
+Respond with ONLY the speaker's name, nothing else.""")
+
+        selection_prompt = f"""{self._history_block("selection")}
+
+Recent speaking frequency (last 10 turns): {speaker_stats}
+{user_priority_note}
 
 Selected speaker:"""
 
-        # Call OpenAI API - increase temperature for diversity
-        client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
-        response = client.chat.completions.create(
-            model=os.getenv("OPENAI_MODEL", "gpt-4o-mini"),
-            messages=[{"role": "user", "content": selection_prompt}],
+        # Call LLM - increase temperature for diversity
+        response = await self._complete(
+            messages=[
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": selection_prompt}
+            ],
             temperature=0.7,  # Increased from 0.3 to 0.7
             max_tokens=20
         )
 
-        selected_name = response.choices[0].message.content.strip()
-        print(f"🎯 Intelligent selection: {selected_name}")
+        selected_name = response.text.strip()
+        logger.debug("LLM selection: %s", selected_name)
 
         # Find corresponding agent
         for agent in self.agents:
@@ -264,49 +300,583 @@ Selected speaker:"""
                 return agent
 
         # If not found, return first one
-        print(f"⚠️ Agent not found, using default")
+        logger.warning("Selected speaker %r not found, using default", selected_name)
         return self.agents[0]
 
-    def next_turn(self):
+    def _find_mentioned_agent(self, content: str, exclude: str = None):
+        """Return first agent addressed with @Name in content, ignoring exclude"""
+        for match in re.finditer(r"@\[?([^\s,.!?:;\]@]+(?:[ _][^\s,.!?:;\]@]+)*)", content):
+            mention = match.group(1).replace("_", " ").lower()
+            for agent in self.agents:
+                name = agent.name.replace("_", " ").lower()
+                if agent.name != exclude and (mention == name or mention.startswith(name + " ")):
+                    return agent
+        return None
+
+    def _heuristic_speaker(self):
         """
-        Execute next turn, return (agent_name, response_text)
-        If discussion ended, return (None, None)
+        Select next speaker with local rules, without an LLM call
+
+        Rules, in order:
+        1. An agent mentioned with @Name in the last message answers
+        2. If the user just spoke, the agent who spoke least recently answers
+        3. Otherwise the least frequent speaker of the last 10 messages, ties
+           broken by who spoke least recently; the last speaker is skipped
+
+        Returns:
+            (agent, path), or (None, None) when the choice is ambiguous
         """
-        if self.current_turn >= self.max_turns:
+        recent = [msg for msg in self.discussion_history[-10:] if msg["role"] != "system"]
+        last = recent[-1] if recent else None
+        last_speaker = last["agent"] if last else None
+
+        if last:
+            mentioned = self._find_mentioned_agent(last["content"], exclude=last_speaker)
+            if mentioned:
+                return mentioned, "mention"
+
+        # Position of each agent's latest message, -1 if silent in the window
+        last_spoke = {agent.name: -1 for agent in self.agents}
+        speaker_count = {agent.name: 0 for agent in self.agents}
+        for i, msg in enumerate(recent):
+            if msg["agent"] in speaker_count:
+                speaker_count[msg["agent"]] += 1
+                last_spoke[msg["agent"]] = i
+
+        candidates = [agent for agent in self.agents if agent.name != last_speaker] or self.agents
+
+        if last_speaker == "You":
+            candidates.sort(key=lambda agent: last_spoke[agent.name])
+            if len(candidates) == 1 or last_spoke[candidates[0].name] != last_spoke[candidates[1].name]:
+                return candidates[0], "user_reply"
             return None, None
 
-        # Select current speaking agent (round-robin or intelligent)
-        if self.discussion_mode == "round_robin":
-            current_agent = self.agents[self.current_turn % len(self.agents)]
+        candidates.sort(key=lambda agent: (speaker_count[agent.name], last_spoke[agent.name]))
+        if len(candidates) == 1:
+            return candidates[0], "balance"
+        first, second = candidates[0], candidates[1]
+        if (speaker_count[first.name], last_spoke[first.name]) != (speaker_count[second.name], last_spoke[second.name]):
+            return first, "balance"
+        return None, None
+
+    async def _choose_speaker(self):
+        """Select current speaking agent (round-robin or intelligent)"""
+        with timed("speaker_selection"):
+            if self.discussion_mode == "round_robin":
+                return self.agents[self.current_turn % len(self.agents)]
+
+            # Auto mode: local rules first, LLM only when they cannot decide
+            if SPEAKER_SELECTOR == "heuristic":
+                agent, path = self._heuristic_speaker()
+                if agent is not None:
+                    selection_stats[path] += 1
+                    logger.debug("Heuristic selection (%s): %s", path, agent.name)
+                    return agent
+
+            selection_stats["llm"] += 1
+            return await self._select_next_speaker()
+
+    async def _complete(self, messages: list, **kwargs):
+        """LLM completion, counting calls and tokens of the current turn"""
+        started = time.perf_counter()
+        response = await get_backend().complete(messages=messages, **kwargs)
+        self._count_usage(response, time.perf_counter() - started)
+        return response
+
+    def _count_usage(self, response: LLMResponse, seconds: float):
+        """Add one call's tokens to the current turn and report them"""
+        self._usage["calls"] += 1
+        self._usage["prompt_tokens"] += response.prompt_tokens
+        self._usage["cached_prompt_tokens"] += response.cached_tokens
+        self._usage["completion_tokens"] += response.completion_tokens
+        logger.debug(
+            "LLM call: prompt_tokens=%d cached=%d uncached=%d completion_tokens=%d seconds=%.2f",
+            response.prompt_tokens, response.cached_tokens, response.prompt_tokens - response.cached_tokens,
+            response.completion_tokens, seconds
+        )
+
+    @staticmethod
+    def _new_usage() -> dict:
+        """Counters of one turn's LLM calls and tokens"""
+        return {"calls": 0, "prompt_tokens": 0, "cached_prompt_tokens": 0, "completion_tokens": 0, "context_tokens": 0}
+
+    @staticmethod
+    def _mode_stats(mode: str) -> dict:
+        return turn_stats.setdefault(mode, {
+            "turns": 0, "seconds": 0.0, "calls": 0, "prompt_tokens": 0, "cached_prompt_tokens": 0,
+            "completion_tokens": 0, "context_tokens": 0, "fallbacks": 0, "streamed": 0, "first_token_seconds": 0.0,
+            "discarded": 0
+        })
+
+    def _record_turn_stats(self, mode: str, seconds: float, usage: dict, fallback: bool = False, first_token: float = None):
+        """Add a committed turn's latency and usage to turn_stats"""
+        stats = self._mode_stats(mode)
+        stats["turns"] += 1
+        stats["seconds"] += seconds
+        stats["fallbacks"] += int(fallback)
+        if first_token is not None:
+            stats["streamed"] += 1
+            stats["first_token_seconds"] += first_token
+        for key, value in usage.items():
+            stats[key] += value
+
+    def _discard_pending_stats(self):
+        """Count a prepared turn that was never committed, e.g. a stale speculative turn"""
+        if self._pending_stats:
+            self._mode_stats(self._pending_stats["mode"])["discarded"] += 1
+            self._pending_stats = None
+
+    def _combined_messages(self) -> list:
+        """Messages asking for speaker and reply in one structured response"""
+        def build_system_message():
+            personas = "\n\n".join(
+                f"### {agent.name}\n{agent.system_message}"
+                for agent in self.agents
+            )
+            return f"""{self._frame()}
+
+You write the next turn of this panel discussion. Pick the speaker who would most naturally respond next, then write their reply exactly as that persona would, following the persona's own rules.
+
+Personas:
+
+{personas}"""
+
+        return [
+            {"role": "system", "content": self._cached_prompt("combined", build_system_message)},
+            {"role": "user", "content": self._build_turn_prompt(None)}
+        ]
+
+    async def _combined_turn(self):
+        """
+        Select speaker and write its reply with a single structured LLM call
+
+        Returns:
+            (agent_name, response_text), None if the response names no known agent
+        """
+        response = await self._complete(
+            messages=self._combined_messages(),
+            temperature=self.temperature,
+            response_format={"type": "json_object"}
+        )
+        try:
+            data = json.loads(response.text)
+            speaker = str(data["speaker"]).strip().lstrip("@")
+            reply = str(data["reply"]).strip()
+        except (ValueError, KeyError, TypeError) as e:
+            logger.warning("Combined turn unparsable (%s), falling back to separate selection", e)
+            return None
+
+        for agent in self.agents:
+            if agent.name.lower() == speaker.replace(" ", "_").lower():
+                logger.debug("Combined selection: %s", agent.name)
+                return agent.name, reply
+
+        logger.warning("Combined turn picked unknown speaker %r, falling back to separate selection", speaker)
+        return None
+
+    def _score_draft(self, agent, draft: str) -> float:
+        """
+        Local relevance score of a draft for the next turn, higher is better
+
+        Favors agents mentioned in the last message, drafts that address the
+        last speaker, and agents who have not spoken for a while. Penalizes
+        the last speaker and drafts repeating the last message.
+        """
+        if not draft.strip():
+            return float("-inf")
+
+        recent = [msg for msg in self.discussion_history[-10:] if msg["role"] != "system"]
+        if not recent:
+            return 0.0
+        last = recent[-1]
+
+        score = 0.0
+        if self._find_mentioned_agent(last["content"], exclude=last["agent"]) is agent:
+            score += 3
+        if last["agent"] == agent.name:
+            score -= 5
+        elif f"@{last['agent']}".replace("_", " ").lower() in draft.replace("_", " ").lower():
+            score += 1
+
+        # Messages since the agent last spoke, capped so silence is not overweighted
+        silent_for = len(recent)
+        for i, msg in enumerate(reversed(recent)):
+            if msg["agent"] == agent.name:
+                silent_for = i
+                break
+        score += min(silent_for, 5) * 0.5
+
+        # Diversity: word overlap with the last message
+        draft_words = set(draft.lower().split())
+        last_words = set(last["content"].lower().split())
+        if draft_words and last_words:
+            score -= 2 * len(draft_words & last_words) / len(draft_words | last_words)
+        return score
+
+    async def _parallel_turn(self):
+        """
+        Draft a reply from every agent concurrently and pick the best locally
+
+        Drafts that were not chosen are kept: if the chosen turn is committed
+        and nothing else changes, the next turn picks from them without any
+        LLM call.
+
+        Returns:
+            (agent_name, response_text)
+        """
+        if self._spare_drafts and self._spare_drafts[0] == self.revision:
+            drafts = self._spare_drafts[1]
+            reused = True
         else:
-            # Auto mode: Intelligently select next speaker
-            current_agent = self._select_next_speaker()
+            responses = await asyncio.gather(*[
+                self._complete(messages=self._reply_messages(agent), temperature=self.temperature)
+                for agent in self.agents
+            ])
+            drafts = {agent.name: response.text for agent, response in zip(self.agents, responses)}
+            reused = False
+
+        agents = [agent for agent in self.agents if agent.name in drafts]
+        chosen = max(agents, key=lambda agent: self._score_draft(agent, drafts[agent.name]))
+        logger.debug("Parallel selection%s: %s", " (reused draft)" if reused else "", chosen.name)
+
+        # Reused drafts are kept for one turn only, after that they answer stale history
+        spare = {} if reused else {name: text for name, text in drafts.items() if name != chosen.name}
+        self._pending_drafts = (self.revision, chosen.name, drafts[chosen.name], spare)
+        return chosen.name, drafts[chosen.name]
+
+    def _frame(self) -> str:
+        """Shared start of every prompt: discussion context and speaker roster"""
+        def build_frame():
+            roster = "\n".join(
+                f"- {agent.name}: {agent.system_message[:100]}..."
+                for agent in self.agents
+            )
+            return f"{self.discussion_history[0]['content']}\n\nSpeakers:\n{roster}"
+        return self._cached_prompt("frame", build_frame)
+
+    def _cached_prompt(self, key, build: Callable[[], str]) -> str:
+        """Static prompt part, assembled on first use"""
+        if key not in self._prompt_cache:
+            self._prompt_cache[key] = build()
+        return self._prompt_cache[key]
+
+    def _history_block(self, kind: str) -> str:
+        """
+        Summary and conversation history within the token budget of a call type
 
-        # Build prompt: include conversation history
-        prompt = f"Discussion topic: {self.topic}\n\n"
-        prompt += "Conversation history:\n"
-        for msg in self.discussion_history[-5:]:  # Only take last 5 rounds
-            if msg["role"] != "system":
-                prompt += f"{msg['agent']}: {msg['content']}\n"
+        The oldest quoted message stays the same from call to call while the
+        history fits, so prompts only grow at the end. Once over budget, the
+        oldest messages are dropped until a quarter of the budget is free
+        again.
+        """
+        budget, message_tokens = CONTEXT_BUDGETS[kind]
+        header = ""
+        if self.summary:
+            header += f"Summary of the earlier discussion:\n{self.summary}\n\n"
+        header += "Conversation history:\n"
+        available = budget - count_tokens(header)
+
+        messages = self._recent_messages()
+        lines = []
+        for msg in messages:
+            content = msg["content"] if message_tokens is None else truncate_tokens(msg["content"], message_tokens)
+            lines.append(f"{msg['agent']}: {content}\n")
+        costs = [count_tokens(line) for line in lines]
+
+        start = next((i for i, msg in enumerate(messages) if msg is self._context_start.get(kind)), 0)
+        if sum(costs[start:]) > available:
+            while start < len(lines) - 1 and sum(costs[start:]) > available * 3 // 4:
+                start += 1
+        if lines and costs[-1] > available:
+            # A single message larger than the whole budget
+            lines[-1] = truncate_tokens(lines[-1], max(available, 1)) + "\n"
+        self._context_start[kind] = messages[start] if messages else None
+
+        block = header + "".join(lines[start:])
+        tokens = count_tokens(block)
+        self._usage["context_tokens"] += tokens
+        stats = context_stats.setdefault(kind, {"builds": 0, "tokens": 0, "max_tokens": 0, "budget": budget})
+        stats["builds"] += 1
+        stats["tokens"] += tokens
+        stats["max_tokens"] = max(stats["max_tokens"], tokens)
+        return block
+
+    def _build_turn_prompt(self, agent) -> str:
+        """Build prompt for agent, or for the combined call if agent is None: include conversation history"""
+        prompt = self._history_block("reply" if agent is not None else "combined")
+
+        if agent is None:
+            names = ", ".join(agent.name for agent in self.agents)
+            prompt += f"""
+Who speaks next? If someone was mentioned with @Name they should usually respond; if the user ("You") just spoke, the reply should respond to them.
+Respond with a JSON object: {{"speaker": "<one of: {names}>", "reply": "<that speaker's reply>"}}"""
+        else:
+            prompt += f"\n{agent.name}, please share your perspective or respond to others:"
+        return prompt
 
-        prompt += f"\n{current_agent.name}, please share your perspective or respond to others:"
+    def _recent_messages(self) -> list:
+        """
+        Messages not yet folded into the summary, quoted verbatim in prompts
 
-        # Let agent generate response
-        print(f"🔍 DEBUG: Preparing to call {current_agent.name}.generate_reply()")
-        messages = [{"role": "user", "content": prompt}]
-        response = current_agent.generate_reply(messages=messages)
-        print(f"🔍 DEBUG: Received {current_agent.name} 's response, length: {len(response) if response else 0}")
+        This is at least the last HISTORY_WINDOW messages. The list only grows
+        at the end between summary updates, so successive prompts share
+        their prefix.
+        """
+        return [msg for msg in self.discussion_history if msg["role"] != "system"]
+
+    def _maybe_summarize(self):
+        """
+        Start folding messages older than the recent window into the summary, in the background
+
+        Called on every history change; the update is applied by _apply_summary.
+        """
+        if self._summary_task:
+            return
+        older = len(self.discussion_history) - 1 - HISTORY_WINDOW  # First entry is the system message
+        if older < SUMMARY_BATCH:
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return  # No event loop (sync scripts): keep full history
+        self._summary_task = loop.create_task(self._summarize(self.discussion_history[1:1 + older]))
+        self._summary_revision = self.revision
+
+    async def _apply_summary(self):
+        """
+        Apply the pending summary update once history changed after it started
+
+        Called before each turn. The update has the turn it was started at
+        to finish in the background and is waited for at the next one, so
+        which prompts see it depends only on the history, not on the
+        summarizer's speed (and recorded LLM calls replay identically).
+        """
+        task = self._summary_task
+        if task is None or self.revision <= self._summary_revision:
+            return
+        # Shielded: a cancelled speculative turn must not cancel the update
+        result = await asyncio.shield(task)
+        if self._summary_task is not task:
+            return  # Applied by another turn while this one waited
+        self._summary_task = None
+        if result:
+            self.summary, folded = result
+            # Still the oldest messages: history only grows at the end
+            del self.discussion_history[1:1 + folded]
+        self._maybe_summarize()
+
+    async def _summarize(self, messages: list):
+        """
+        Merge messages into the running summary
+
+        Returns:
+            (new_summary, number_of_messages_folded), None on failure
+        """
+        transcript = "\n".join(f"{msg['agent']}: {msg['content']}" for msg in messages)
+        prompt = f"""Discussion topic: {self.topic}
+
+Summary so far:
+{self.summary or "(none)"}
+
+New messages:
+{transcript}
+
+Update the summary so far with the new messages. Keep who argued what, points of disagreement, open questions and unanswered @mentions. Use at most {SUMMARY_MAX_WORDS} words and reply with the summary only."""
+
+        try:
+            with timed("summary"):
+                response = await get_backend().complete(
+                    messages=[{"role": "user", "content": prompt}],
+                    temperature=0.3,
+                    max_tokens=SUMMARY_MAX_WORDS * 2
+                )
+        except Exception as e:
+            summary_stats["failures"] += 1
+            logger.warning("Summary update failed, keeping full history: %s", e)
+            return None
+
+        summary_stats["runs"] += 1
+        summary_stats["folded_messages"] += len(messages)
+        summary_stats["prompt_tokens"] += response.prompt_tokens
+        summary_stats["completion_tokens"] += response.completion_tokens
+        return response.text.strip(), len(messages)
+
+    def _reply_messages(self, agent) -> list:
+        """Messages for agent's reply: its system message followed by the turn prompt"""
+        system_message = self._cached_prompt(
+            ("reply", agent.name),
+            lambda: f"{self._frame()}\n\n{agent.system_message}"
+        )
+        return [
+            {"role": "system", "content": system_message},
+            {"role": "user", "content": self._build_turn_prompt(agent)}
+        ]
+
+    def _record_turn(self, agent_name: str, response: str):
+        """Record agent response to history and advance turn counter"""
+        # Spare drafts stay usable only if this is the parallel turn they were drafted with
+        pending, self._pending_drafts = self._pending_drafts, None
+        self._spare_drafts = None
+        if pending and pending[:3] == (self.revision, agent_name, response) and pending[3]:
+            self._spare_drafts = (self.revision + 1, pending[3])
 
-        # Record to history
         self.discussion_history.append({
             "role": "assistant",
-            "agent": current_agent.name,
+            "agent": agent_name,
             "content": response
         })
 
         self.current_turn += 1
+        self.revision += 1
+        self._maybe_summarize()
+
+    async def prepare_turn(self):
+        """
+        Select speaker and generate response without recording it
+
+        History is left untouched, so the result can be computed ahead of time
+        and later committed with commit_turn, or thrown away.
 
-        return current_agent.name, response
+        Returns:
+            (agent_name, response_text), (None, None) if discussion ended
+        """
+        if self.current_turn >= self.max_turns:
+            return None, None
+        await self._apply_summary()
+
+        mode = self.discussion_mode
+        started = time.perf_counter()
+        fallback = False
+        self._discard_pending_stats()
+        # Fresh counters: a cancelled speculative turn may have left some behind
+        usage = self._usage = self._new_usage()
+
+        result = None
+        if mode == "combined":
+            # Selection and reply in one call, timed as reply generation
+            with timed("reply_generation"):
+                result = await self._combined_turn()
+            fallback = result is None
+        elif mode == "parallel":
+            with timed("reply_generation"):
+                result = await self._parallel_turn()
+
+        if result is None:
+            current_agent = await self._choose_speaker()
+
+            # Let agent generate response
+            with timed("reply_generation"):
+                response = await self._complete(
+                    messages=self._reply_messages(current_agent),
+                    temperature=self.temperature
+                )
+            result = current_agent.name, response.text
+            logger.debug("Reply from %s: %d characters", current_agent.name, len(response.text))
+
+        self._pending_stats = {
+            "turn": (self.revision, *result), "mode": mode,
+            "seconds": time.perf_counter() - started, "usage": usage, "fallback": fallback, "first_token": None
+        }
+        return result
+
+    def commit_turn(self, agent_name: str, response: str):
+        """Record a turn produced by prepare_turn or stream_next_turn, adding its latency and usage to turn_stats"""
+        pending = self._pending_stats
+        if pending and pending["turn"] == (self.revision, agent_name, response):
+            self._pending_stats = None
+            self._record_turn_stats(
+                pending["mode"], pending["seconds"], pending["usage"], pending["fallback"], pending["first_token"]
+            )
+        else:
+            self._discard_pending_stats()
+        self._record_turn(agent_name, response)
+
+    async def next_turn(self):
+        """
+        Execute next turn, return (agent_name, response_text)
+        If discussion ended, return (None, None)
+        """
+        agent_name, response = await self.prepare_turn()
+        if agent_name is not None:
+            self.commit_turn(agent_name, response)
+
+        return agent_name, response
+
+    async def stream_next_turn(self):
+        """
+        Execute next turn, streaming the response while it is generated
+
+        Like prepare_turn, history is left untouched: once the caller has
+        saved the reply, it records the turn with commit_turn.
+
+        Yields:
+            ("speaker", agent_name) once the speaker is selected, then
+            ("token", text) for each chunk of the response as it arrives.
+            Yields nothing if discussion ended.
+        """
+        if self.current_turn >= self.max_turns:
+            return
+        await self._apply_summary()
+
+        if self.discussion_mode in ("combined", "parallel"):
+            # The speaker is only known once the structured reply or all drafts are complete
+            agent_name, response = await self.prepare_turn()
+            yield "speaker", agent_name
+            yield "token", response
+            return
+
+        started = time.perf_counter()
+        self._discard_pending_stats()
+        usage = self._usage = self._new_usage()
+        current_agent = await self._choose_speaker()
+        yield "speaker", current_agent.name
+
+        parts = []
+        stream_usage = LLMResponse(text="")
+        call_started = time.perf_counter()
+        first_token = None
+        async for delta in get_backend().stream(
+            messages=self._reply_messages(current_agent),
+            temperature=self.temperature,
+            usage=stream_usage
+        ):
+            if first_token is None:
+                first_token = time.perf_counter() - started
+            parts.append(delta)
+            yield "token", delta
+
+        # Includes the time consumers spend on each token, mostly broadcasting it
+        stage_seconds.observe("reply_generation", time.perf_counter() - call_started)
+        self._count_usage(stream_usage, time.perf_counter() - call_started)
+        self._pending_stats = {
+            "turn": (self.revision, current_agent.name, "".join(parts)), "mode": self.discussion_mode,
+            "seconds": time.perf_counter() - started, "usage": usage, "fallback": False, "first_token": first_token
+        }
+
+    def restore_history(self, messages: list):
+        """
+        Replay saved messages into a freshly initialized discussion
+
+        Args:
+            messages: (agent_name, content) pairs in order, agent "You" for user messages
+        """
+        for agent_name, content in messages:
+            if agent_name == "You":
+                self.discussion_history.append({"role": "user", "agent": "You", "content": content})
+            else:
+                self.discussion_history.append({"role": "assistant", "agent": agent_name, "content": content})
+                self.current_turn += 1
+        self.revision += len(messages)
+        # Older messages are folded into a new summary in the background
+        self._maybe_summarize()
+
+    def memory_bytes(self) -> int:
+        """Approximate size of the texts held: history, summary, assembled prompts and personas"""
+        texts = [msg["content"] for msg in self.discussion_history]
+        texts += list(self._prompt_cache.values())
+        texts += [agent.system_message for agent in self.agents]
+        texts.append(self.summary)
+        return sum(sys.getsizeof(text) for text in texts)
 
     def add_user_message(self, content: str):
         """
@@ -320,3 +890,5 @@ Selected speaker:"""
             "agent": "You",
             "content": content
         })
+        self.revision += 1
+        self._maybe_summarize()
@@ -0,0 +1,135 @@
+"""
+Audio Store - Persistent content-addressed storage for generated audio
+"""
+import os
+import time
+import hashlib
+import logging
+import pathlib
+from datetime import datetime, timedelta
+from typing import Optional
+
+from sqlalchemy import func
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+from database import AudioBlob, Message
+
+logger = logging.getLogger(__name__)
+
+
+class AudioStore:
+    """
+    Filesystem blob store for audio segments, referenced from Message.audio_hash
+
+    Blobs are named by the sha256 of their content, so identical audio
+    (replayed fallback personas, repeated user messages) is stored once.
+    The audio_blobs table tracks every blob for garbage collection.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = pathlib.Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    def path(self, audio_hash: str) -> pathlib.Path:
+        return self.directory / audio_hash[:2] / f"{audio_hash}.mp3"
+
+    def put(self, db: Session, data: bytes) -> str:
+        """
+        Store audio, deduplicated by content hash
+
+        The blob row is inserted in its own transaction and left alone if
+        it already exists, so concurrent requests storing the same audio do
+        not conflict. Until a committed message references it, garbage
+        collection keeps it for the grace period.
+
+        Returns:
+            str: Content hash to store in Message.audio_hash
+        """
+        audio_hash = hashlib.sha256(data).hexdigest()
+        path = self.path(audio_hash)
+        if not path.exists():
+            path.parent.mkdir(exist_ok=True)
+            # Write to a temporary file first so readers never see partial audio
+            tmp_path = path.with_suffix(f".{os.getpid()}.{time.monotonic_ns()}.tmp")
+            tmp_path.write_bytes(data)
+            os.replace(tmp_path, path)
+
+        with db.get_bind().begin() as conn:
+            conn.execute(
+                sqlite_insert(AudioBlob)
+                .values(hash=audio_hash, size=len(data), created_at=datetime.utcnow())
+                .on_conflict_do_nothing(index_elements=["hash"])
+            )
+        return audio_hash
+
+    def size(self, audio_hash: str) -> Optional[int]:
+        """Size of a blob in bytes, None if missing"""
+        try:
+            return self.path(audio_hash).stat().st_size
+        except OSError:
+            return None
+
+    def read(self, audio_hash: str, start: int = 0, end: Optional[int] = None) -> bytes:
+        """Read a blob, or its inclusive byte range [start, end]"""
+        with open(self.path(audio_hash), "rb") as f:
+            f.seek(start)
+            return f.read() if end is None else f.read(end - start + 1)
+
+    def collect_garbage(self, db: Session, retention_days: int = 0, grace_seconds: int = 3600) -> dict:
+        """
+        Apply retention policy and delete blobs no message refers to
+
+        Args:
+            db: Database session
+            retention_days: Drop audio of messages older than this, 0 keeps it forever
+            grace_seconds: Never delete blobs younger than this, their message may not be committed yet
+
+        Returns:
+            dict: Number of expired message audios and deleted blobs, bytes freed
+        """
+        expired = 0
+        if retention_days > 0:
+            cutoff = datetime.utcnow() - timedelta(days=retention_days)
+            expired = db.query(Message).filter(
+                Message.timestamp < cutoff,
+                Message.audio_hash.isnot(None)
+            ).update({Message.audio_hash: None}, synchronize_session=False)
+            db.commit()
+
+        grace_cutoff = datetime.utcnow() - timedelta(seconds=grace_seconds)
+        referenced = db.query(Message.audio_hash).filter(Message.audio_hash.isnot(None))
+        unreferenced = db.query(AudioBlob).filter(
+            AudioBlob.hash.notin_(referenced),
+            AudioBlob.created_at < grace_cutoff
+        ).all()
+
+        deleted = 0
+        freed = 0
+        for blob in unreferenced:
+            try:
+                self.path(blob.hash).unlink()
+            except FileNotFoundError:
+                pass
+            deleted += 1
+            freed += blob.size
+            db.delete(blob)
+        db.commit()
+
+        # Files without a row: written by a request whose commit never happened
+        known = {audio_hash for (audio_hash,) in db.query(AudioBlob.hash)}
+        for path in self.directory.glob("*/*"):
+            if path.suffix == ".mp3" and path.stem in known:
+                continue
+            stat = path.stat()
+            if time.time() - stat.st_mtime > grace_seconds:
+                path.unlink()
+                deleted += 1
+                freed += stat.st_size
+
+        return {"expired": expired, "deleted": deleted, "bytes_freed": freed}
+
+    def stats(self, db: Session) -> dict:
+        """Blob count and total size"""
+        blobs, total = db.query(func.count(AudioBlob.hash), func.coalesce(func.sum(AudioBlob.size), 0)).one()
+        return {"blobs": blobs, "bytes": total}
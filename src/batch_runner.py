@@ -0,0 +1,250 @@
+#!/usr/bin/env python3
+"""
+Batch Runner - Run full discussions for many topics without the web UI
+
+Topics are read from a text file (one per line, # starts a comment) or a
+JSONL file of {"id": ..., "topic": ...} objects. Each finished discussion
+is appended to the output as one JSON line, so an interrupted run resumes
+where it stopped: topics already completed in the output are skipped.
+
+    python src/batch_runner.py topics.txt -o results.jsonl --concurrency 4
+    python src/batch_runner.py topics.txt -o results.jsonl --audio-dir audio/
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import hashlib
+import argparse
+import pathlib
+import logging
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from agents import DISCUSSION_MODES, MultiAgentDiscussion, turn_stats
+from llm import get_backend
+from metrics import setup_logging, stop_logging
+from role_generator import generate_discussion_roles
+from tts_handler import fish_audio, select_voice_for_role, synthesize_speech
+from workers import worker_pool
+
+logger = logging.getLogger("batch_runner")
+
+
+def topic_id(topic: str) -> str:
+    """Stable id of a topic given without one"""
+    return hashlib.sha256(topic.encode("utf-8")).hexdigest()[:12]
+
+
+def load_topics(path: pathlib.Path) -> list:
+    """Read (id, topic) pairs from a text or JSONL file"""
+    topics = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            if path.suffix == ".jsonl":
+                item = json.loads(line)
+                topics.append((str(item.get("id") or topic_id(item["topic"])), item["topic"]))
+            else:
+                topics.append((topic_id(line), line))
+    return topics
+
+
+def completed_ids(path: pathlib.Path) -> set:
+    """Ids of topics whose discussion is already completed in the output file"""
+    done = set()
+    if not path.exists():
+        return done
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue  # Last line cut off by an interruption
+            if record.get("status") == "completed":
+                done.add(record["id"])
+    return done
+
+
+class ResultWriter:
+    """Appends one JSON line per discussion, flushed so interruptions lose no finished work"""
+
+    def __init__(self, path: pathlib.Path):
+        self.path = path
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = open(path, "a", encoding="utf-8")
+        self._lock = asyncio.Lock()
+        if self._ends_mid_line():
+            # Terminate the line cut off by an interruption, or the next record is glued to it
+            self._append("\n")
+
+    def _ends_mid_line(self) -> bool:
+        with open(self.path, "rb") as f:
+            if f.seek(0, os.SEEK_END) == 0:
+                return False
+            f.seek(-1, os.SEEK_END)
+            return f.read(1) != b"\n"
+
+    async def write(self, record: dict):
+        line = json.dumps(record, ensure_ascii=False) + "\n"
+        async with self._lock:
+            await worker_pool.run(self._append, line)
+
+    def _append(self, line: str):
+        self._file.write(line)
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def close(self):
+        self._file.close()
+
+
+class Progress:
+    """Throughput counters, reported periodically"""
+
+    def __init__(self, total: int):
+        self.total = total
+        self.completed = 0
+        self.failed = 0
+        self.turns = 0
+        self.audio_bytes = 0
+        self.started = time.perf_counter()
+
+    def line(self) -> str:
+        elapsed = time.perf_counter() - self.started
+        return (
+            f"{self.completed + self.failed}/{self.total} discussions ({self.failed} failed), "
+            f"{self.turns} turns in {elapsed:.0f}s: "
+            f"{self.turns / elapsed if elapsed else 0:.2f} turns/s, "
+            f"{60 * self.completed / elapsed if elapsed else 0:.1f} discussions/min"
+        )
+
+    async def report(self, interval: float):
+        while True:
+            await asyncio.sleep(interval)
+            logger.info(self.line())
+
+
+async def run_discussion(item_id: str, topic: str, args, progress: Progress) -> dict:
+    """Generate roles and play one discussion to the end"""
+    started = time.perf_counter()
+    roles = await generate_discussion_roles(topic, num_roles=args.roles)
+    voices = {
+        role["name"]: select_voice_for_role(role.get("display_name", role["name"]), role.get("personality", ""))
+        for role in roles
+    }
+
+    discussion = MultiAgentDiscussion(discussion_mode=args.mode, custom_roles=roles)
+    discussion.init_discussion(topic)
+    discussion.max_turns = args.turns
+
+    turns = []
+    while True:
+        agent_name, content = await discussion.next_turn()
+        if agent_name is None:
+            break
+        turn = {"agent": agent_name, "content": content}
+        if args.audio_dir:
+            audio = await synthesize_speech(content, voices[agent_name])
+            if audio:
+                turn["audio"] = await worker_pool.run(save_audio, args.audio_dir, item_id, len(turns), audio)
+                progress.audio_bytes += len(audio)
+        turns.append(turn)
+        progress.turns += 1
+
+    return {
+        "id": item_id,
+        "topic": topic,
+        "status": "completed",
+        "mode": args.mode,
+        "roles": [
+            {"name": role.get("display_name", role["name"]), "stance": role["stance"], "personality": role["personality"]}
+            for role in roles
+        ],
+        "turns": turns,
+        "summary": discussion.summary,
+        "seconds": round(time.perf_counter() - started, 3)
+    }
+
+
+def save_audio(audio_dir: pathlib.Path, item_id: str, index: int, audio: bytes) -> str:
+    """Write a turn's audio, returning its path relative to audio_dir"""
+    path = audio_dir / item_id / f"{index:03d}.mp3"
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(audio)
+    return str(path.relative_to(audio_dir))
+
+
+async def run_batch(args):
+    topics = load_topics(args.topics)
+    done = completed_ids(args.output)
+    pending = [(item_id, topic) for item_id, topic in topics if item_id not in done]
+    if done:
+        logger.info("Resuming: %d of %d topics already completed", len(topics) - len(pending), len(topics))
+
+    progress = Progress(len(pending))
+    writer = ResultWriter(args.output)
+    limit = asyncio.Semaphore(args.concurrency)
+
+    async def run_one(item_id: str, topic: str):
+        async with limit:
+            try:
+                record = await run_discussion(item_id, topic, args, progress)
+                progress.completed += 1
+            except Exception as e:
+                logger.error("Discussion %s failed: %s", item_id, e)
+                record = {"id": item_id, "topic": topic, "status": "failed", "error": str(e)}
+                progress.failed += 1
+            await writer.write(record)
+
+    worker_pool.start()
+    await fish_audio.start()
+    reporter = asyncio.create_task(progress.report(args.progress_interval))
+    try:
+        await asyncio.gather(*[run_one(item_id, topic) for item_id, topic in pending])
+    finally:
+        reporter.cancel()
+        writer.close()
+        await fish_audio.close()
+        await get_backend().close()
+        worker_pool.shutdown()
+
+    logger.info("Done: %s", progress.line())
+    for mode, stats in turn_stats.items():
+        logger.info(
+            "%s mode: %d turns, %d LLM calls, %d prompt tokens (%d cached), %d completion tokens",
+            mode, stats["turns"], stats["calls"], stats["prompt_tokens"],
+            stats["cached_prompt_tokens"], stats["completion_tokens"]
+        )
+    return progress.failed == 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("topics", type=pathlib.Path, help="text file with one topic per line, or JSONL")
+    parser.add_argument("-o", "--output", type=pathlib.Path, default=pathlib.Path("discussions.jsonl"),
+                        help="JSONL results, appended to and used to resume")
+    parser.add_argument("--concurrency", type=int, default=4, help="discussions run at the same time")
+    parser.add_argument("--turns", type=int, default=12, help="turns per discussion")
+    parser.add_argument("--roles", type=int, default=3, help="roles per discussion")
+    parser.add_argument("--mode", default="auto", choices=DISCUSSION_MODES, help="discussion mode")
+    parser.add_argument("--audio-dir", type=pathlib.Path,
+                        help="synthesize every turn and store MP3 files here (needs FISH_AUDIO_API_KEY)")
+    parser.add_argument("--progress-interval", type=float, default=10.0, help="seconds between progress lines")
+    args = parser.parse_args()
+
+    setup_logging()
+    try:
+        ok = asyncio.run(run_batch(args))
+    finally:
+        stop_logging()
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
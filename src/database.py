@@ -1,4 +1,4 @@
-from sqlalchemy import create_engine, Column, Integer, String, Text, DateTime, ForeignKey
+from sqlalchemy import create_engine, inspect, text, Column, Integer, String, Text, DateTime, ForeignKey
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, relationship
 from datetime import datetime
@@ -22,6 +22,9 @@ class Discussion(Base):
     topic = Column(String(500), nullable=False)
     created_at = Column(DateTime, default=datetime.utcnow)
     status = Column(String(20), default="running")  # running, completed, error
+    mode = Column(String(20), default="auto")  # Discussion mode, see agents.DISCUSSION_MODES
+    roles = Column(Text, nullable=True)  # JSON list of generated roles, set by /init
+    voices = Column(Text, nullable=True)  # JSON role name -> voice id, set by /init
 
     messages = relationship("Message", back_populates="discussion", cascade="all, delete-orphan")
 
@@ -34,12 +37,52 @@ class Message(Base):
     content = Column(Text, nullable=False)
     timestamp = Column(DateTime, default=datetime.utcnow)
     message_type = Column(String(20), default="chat")  # chat, search, system
+    voice_id = Column(String(64), nullable=True)  # Voice the message is (or would be) spoken with
+    audio_hash = Column(String(64), ForeignKey("audio_blobs.hash"), nullable=True, index=True)
 
     discussion = relationship("Discussion", back_populates="messages")
 
+    @property
+    def audio_url(self):
+        """URL the message audio is served from, None if it has no audio"""
+        return f"/messages/{self.id}/audio" if self.audio_hash else None
+
+class AudioBlob(Base):
+    __tablename__ = "audio_blobs"
+
+    hash = Column(String(64), primary_key=True)  # sha256 of content, file name in the audio store
+    size = Column(Integer, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+class RoleSet(Base):
+    __tablename__ = "role_sets"
+
+    id = Column(Integer, primary_key=True, index=True)
+    topic_key = Column(String(500), nullable=False, index=True)  # Normalized topic
+    num_roles = Column(Integer, nullable=False)
+    topic = Column(String(500), nullable=False)  # Topic the roles were generated for
+    roles = Column(Text, nullable=False)  # JSON list of generated roles
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow)  # Last (re)generation
+
 def init_db():
     """Initialize database"""
     Base.metadata.create_all(bind=engine)
+    _add_missing_columns()
+
+def _add_missing_columns():
+    """Add columns introduced after a table was created (create_all skips existing tables)"""
+    inspector = inspect(engine)
+    for table in Base.metadata.sorted_tables:
+        existing = {column["name"] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name not in existing:
+                column_type = column.type.compile(engine.dialect)
+                with engine.begin() as conn:
+                    conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}"))
+                for index in table.indexes:
+                    if column.name in index.columns:
+                        index.create(bind=engine, checkfirst=True)
 
 def get_db():
     """Get database session"""
@@ -0,0 +1,370 @@
+"""
+LLM Backend - Async chat completion interface used by agents and role generation
+"""
+import os
+import json
+import asyncio
+import hashlib
+import logging
+import pathlib
+import functools
+from dataclasses import dataclass
+from typing import AsyncIterator, Callable, List, Optional
+
+import httpx
+import msgpack
+
+logger = logging.getLogger(__name__)
+
+# Maximum open connections of the shared OpenAI client
+OPENAI_MAX_CONNECTIONS = int(os.getenv("OPENAI_MAX_CONNECTIONS", 100))
+# Response store: "passthrough" (off), "record" (call the LLM and store) or "replay" (serve stored only)
+LLM_CACHE_MODE = os.getenv("LLM_CACHE_MODE", "passthrough")
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", "./llm_cache.msgpack")
+
+
+@functools.lru_cache(maxsize=None)
+def _encoding():
+    """Tokenizer of the configured model, None if it cannot be loaded"""
+    try:
+        import tiktoken
+        try:
+            return tiktoken.encoding_for_model(os.getenv("OPENAI_MODEL", "gpt-4o-mini"))
+        except KeyError:
+            return tiktoken.get_encoding("cl100k_base")
+    except Exception as e:
+        # Encodings are downloaded on first use, which fails offline
+        logger.warning("Tokenizer unavailable (%s), estimating 4 characters per token", e)
+        return None
+
+
+@functools.lru_cache(maxsize=8192)
+def count_tokens(text: str) -> int:
+    """Number of tokens in text, cached since history lines are counted on every turn"""
+    encoding = _encoding()
+    if encoding is None:
+        return (len(text) + 3) // 4
+    return len(encoding.encode(text))
+
+
+def truncate_tokens(text: str, max_tokens: int) -> str:
+    """Cut text to about max_tokens at a word boundary, marking the cut with an ellipsis"""
+    if count_tokens(text) <= max_tokens:
+        return text
+    encoding = _encoding()
+    if encoding is None:
+        cut = text[:max_tokens * 4]
+    else:
+        cut = encoding.decode(encoding.encode(text)[:max_tokens])
+    # Do not end in the middle of a word
+    space = cut.rfind(" ")
+    if space > len(cut) // 2:
+        cut = cut[:space]
+    return cut.rstrip() + "..."
+
+
+@dataclass
+class LLMResponse:
+    """Completion text and token usage"""
+    text: str
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    cached_tokens: int = 0  # Part of prompt_tokens served from the provider's prompt cache
+
+
+def _field(obj, name: str, default=None):
+    """Read a usage field from a model or, for fields this SDK version does not know, a dict"""
+    if obj is None:
+        return default
+    if isinstance(obj, dict):
+        return obj.get(name, default)
+    return getattr(obj, name, default)
+
+
+def _read_usage(usage, response: LLMResponse):
+    """Copy token counts of an API usage object into response"""
+    response.prompt_tokens = _field(usage, "prompt_tokens", 0) or 0
+    response.completion_tokens = _field(usage, "completion_tokens", 0) or 0
+    response.cached_tokens = _field(_field(usage, "prompt_tokens_details"), "cached_tokens", 0) or 0
+
+
+class LLMBackend:
+    """
+    Interface for chat completion backends
+
+    Implementations must be safe to share between all discussions on the
+    event loop.
+    """
+
+    async def complete(
+        self,
+        messages: List[dict],
+        temperature: float = 0.7,
+        max_tokens: Optional[int] = None,
+        response_format: Optional[dict] = None
+    ) -> LLMResponse:
+        """Return the full completion for messages"""
+        raise NotImplementedError
+
+    def stream(
+        self,
+        messages: List[dict],
+        temperature: float = 0.7,
+        max_tokens: Optional[int] = None,
+        usage: Optional[LLMResponse] = None,
+        response_format: Optional[dict] = None
+    ) -> AsyncIterator[str]:
+        """
+        Yield the completion for messages piece by piece as it is generated (async generator)
+
+        If usage is given, its text and token counts are filled in once the
+        stream is exhausted.
+        """
+        raise NotImplementedError
+
+    async def close(self):
+        """Release connections"""
+
+
+class OpenAIBackend(LLMBackend):
+    """OpenAI chat completions through one pooled AsyncOpenAI client"""
+
+    def __init__(self, api_key: Optional[str] = None, model: Optional[str] = None):
+        self.api_key = api_key or os.getenv("OPENAI_API_KEY")
+        self.model = model or os.getenv("OPENAI_MODEL", "gpt-4o-mini")
+        self._client = None
+
+    @property
+    def client(self):
+        if self._client is None:
+            from openai import AsyncOpenAI
+            self._client = AsyncOpenAI(
+                api_key=self.api_key,
+                http_client=httpx.AsyncClient(
+                    limits=httpx.Limits(
+                        max_connections=OPENAI_MAX_CONNECTIONS,
+                        max_keepalive_connections=OPENAI_MAX_CONNECTIONS
+                    ),
+                    timeout=httpx.Timeout(60.0, connect=10.0)
+                )
+            )
+        return self._client
+
+    async def complete(self, messages, temperature=0.7, max_tokens=None, response_format=None):
+        kwargs = {}
+        if max_tokens is not None:
+            kwargs["max_tokens"] = max_tokens
+        if response_format is not None:
+            kwargs["response_format"] = response_format
+
+        response = await self.client.chat.completions.create(
+            model=self.model,
+            messages=messages,
+            temperature=temperature,
+            **kwargs
+        )
+        result = LLMResponse(text=response.choices[0].message.content or "")
+        _read_usage(response.usage, result)
+        return result
+
+    async def stream(self, messages, temperature=0.7, max_tokens=None, usage=None, response_format=None):
+        kwargs = {}
+        if max_tokens is not None:
+            kwargs["max_tokens"] = max_tokens
+        if response_format is not None:
+            kwargs["response_format"] = response_format
+
+        stream = await self.client.chat.completions.create(
+            model=self.model,
+            messages=messages,
+            temperature=temperature,
+            stream=True,
+            # Final chunk carries token usage (not a typed option in this SDK version)
+            extra_body={"stream_options": {"include_usage": True}},
+            **kwargs
+        )
+        parts = []
+        async for chunk in stream:
+            if usage is not None and _field(chunk, "usage"):
+                _read_usage(_field(chunk, "usage"), usage)
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta.content
+            if delta:
+                parts.append(delta)
+                yield delta
+        if usage is not None:
+            usage.text = "".join(parts)
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.close()
+            self._client = None
+
+
+class FakeBackend(LLMBackend):
+    """
+    Local stand-in for tests and offline runs
+
+    Replies come from reply(messages), or a fixed emotion-tagged sentence,
+    after an optional simulated latency. Token counts are estimated at four
+    characters per token; the prefix shared with any earlier prompt counts
+    as cached, like a provider-side prompt cache.
+    """
+
+    def __init__(self, reply: Optional[Callable[[List[dict]], str]] = None, latency: float = 0.0, chunk_size: int = 8):
+        self.reply = reply or (lambda messages: "(calm) This is a placeholder reply.")
+        self.latency = latency
+        self.chunk_size = chunk_size
+        self.calls = 0
+        self._prompts = []
+
+    async def complete(self, messages, temperature=0.7, max_tokens=None, response_format=None):
+        self.calls += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        text = self.reply(messages)
+        prompt = "".join(m["content"] for m in messages)
+        cached = max((len(os.path.commonprefix([prompt, p])) for p in self._prompts), default=0)
+        self._prompts = self._prompts[-31:] + [prompt]
+        return LLMResponse(
+            text=text,
+            prompt_tokens=len(prompt) // 4,
+            completion_tokens=len(text) // 4,
+            cached_tokens=cached // 4
+        )
+
+    async def stream(self, messages, temperature=0.7, max_tokens=None, usage=None, response_format=None):
+        response = await self.complete(messages, temperature, max_tokens, response_format)
+        if usage is not None:
+            _copy_response(response, usage)
+        for i in range(0, len(response.text), self.chunk_size):
+            yield response.text[i:i + self.chunk_size]
+
+
+class ReplayMiss(LookupError):
+    """Replay mode found no stored response for a request"""
+
+
+class RecordReplayBackend(LLMBackend):
+    """
+    Store of LLM responses in front of another backend, for deterministic offline runs
+
+    Responses are keyed by a hash of (model, messages, temperature,
+    max_tokens, response_format). In record mode every call goes to the
+    wrapped backend and its response is appended to the store; in replay
+    mode only stored responses are served, without delay. The store is an
+    append-only file of msgpack records.
+    """
+
+    MODES = ("record", "replay")
+
+    def __init__(self, backend: LLMBackend, path: str, mode: str = "replay"):
+        if mode not in self.MODES:
+            raise ValueError(f"Unknown LLM cache mode {mode!r}, expected one of: {', '.join(self.MODES)}")
+        self.backend = backend
+        self.path = pathlib.Path(path)
+        self.mode = mode
+        self.hits = 0
+        self.misses = 0
+        self.recorded = 0
+        self._responses = {}  # key -> (text, prompt_tokens, completion_tokens, cached_tokens)
+        self._load()
+
+    def _load(self):
+        if not self.path.exists():
+            return
+        with open(self.path, "rb") as f:
+            for key, *response in msgpack.Unpacker(f, raw=False):
+                self._responses[key] = tuple(response)  # Later records win
+
+    def make_key(self, messages, temperature, max_tokens, response_format) -> bytes:
+        payload = json.dumps(
+            [getattr(self.backend, "model", ""), messages, temperature, max_tokens, response_format],
+            sort_keys=True
+        )
+        return hashlib.sha256(payload.encode("utf-8")).digest()
+
+    def _replay(self, key: bytes) -> LLMResponse:
+        stored = self._responses.get(key)
+        if stored is None:
+            self.misses += 1
+            raise ReplayMiss(f"No recorded LLM response in {self.path}, record this run first")
+        self.hits += 1
+        text, prompt_tokens, completion_tokens, cached_tokens = stored
+        return LLMResponse(text, prompt_tokens, completion_tokens, cached_tokens)
+
+    def _record(self, key: bytes, response: LLMResponse):
+        record = (response.text, response.prompt_tokens, response.completion_tokens, response.cached_tokens)
+        self._responses[key] = record
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path, "ab") as f:
+            f.write(msgpack.packb([key, *record], use_bin_type=True))
+        self.recorded += 1
+
+    async def complete(self, messages, temperature=0.7, max_tokens=None, response_format=None):
+        key = self.make_key(messages, temperature, max_tokens, response_format)
+        if self.mode == "replay":
+            return self._replay(key)
+        response = await self.backend.complete(messages, temperature, max_tokens, response_format)
+        self._record(key, response)
+        return response
+
+    async def stream(self, messages, temperature=0.7, max_tokens=None, usage=None, response_format=None):
+        key = self.make_key(messages, temperature, max_tokens, response_format)
+        if self.mode == "replay":
+            response = self._replay(key)
+            if usage is not None:
+                _copy_response(response, usage)
+            for i in range(0, len(response.text), 16):
+                yield response.text[i:i + 16]
+            return
+
+        recorded = LLMResponse(text="")
+        async for delta in self.backend.stream(messages, temperature, max_tokens, usage=recorded, response_format=response_format):
+            yield delta
+        self._record(key, recorded)
+        if usage is not None:
+            _copy_response(recorded, usage)
+
+    async def close(self):
+        await self.backend.close()
+
+    def stats(self) -> dict:
+        return {
+            "mode": self.mode,
+            "entries": len(self._responses),
+            "hits": self.hits,
+            "misses": self.misses,
+            "recorded": self.recorded
+        }
+
+
+def _copy_response(source: LLMResponse, target: LLMResponse):
+    target.text = source.text
+    target.prompt_tokens = source.prompt_tokens
+    target.completion_tokens = source.completion_tokens
+    target.cached_tokens = source.cached_tokens
+
+
+_backend: Optional[LLMBackend] = None
+
+
+def get_backend() -> LLMBackend:
+    """
+    Shared backend: OpenAI unless LLM_BACKEND=fake or set_backend was called,
+    behind the response store unless LLM_CACHE_MODE=passthrough
+    """
+    global _backend
+    if _backend is None:
+        backend = FakeBackend() if os.getenv("LLM_BACKEND") == "fake" else OpenAIBackend()
+        if LLM_CACHE_MODE != "passthrough":
+            backend = RecordReplayBackend(backend, LLM_CACHE_PATH, LLM_CACHE_MODE)
+        _backend = backend
+    return _backend
+
+
+def set_backend(backend: LLMBackend):
+    """Replace the shared backend, e.g. with a FakeBackend in tests"""
+    global _backend
+    _backend = backend
@@ -1,28 +1,91 @@
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect, Depends, HTTPException, Request, UploadFile, File, Form
+from fastapi import FastAPI, WebSocket, WebSocketDisconnect, Depends, HTTPException, Request, Response, UploadFile, File, Form
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
 from sqlalchemy.orm import Session
 from pydantic import BaseModel
-from typing import List, Optional
+from typing import Dict, List, Optional, Tuple
+from contextlib import asynccontextmanager
 import asyncio
 import json
+import logging
 from datetime import datetime
 import os
 from dotenv import load_dotenv
 
-from database import init_db, get_db, Discussion, Message
-from agents import MultiAgentDiscussion
-from role_generator import generate_discussion_roles
-from tts_handler import generate_tts, select_voice_for_role, VOICE_PROFILES, create_voice_clone
+from database import init_db, get_db, SessionLocal, Discussion, Message
+from agents import MultiAgentDiscussion, DISCUSSION_MODES, context_stats, selection_stats, summary_stats, turn_stats
+from audio_store import AudioStore
+from workers import worker_pool
+from llm import RecordReplayBackend, count_tokens, get_backend
+from metrics import registry, setup_logging, stop_logging, timed
+from role_cache import role_cache
+from session_store import SessionStore
+from tts_handler import (
+    synthesize_speech, generate_tts_chunks, SentenceSplitter, mp3_silence,
+    select_voice_for_role, VOICE_PROFILES, create_voice_clone, tts_cache, fish_audio
+)
 
 # Load environment variables
 load_dotenv()
+setup_logging()
+logger = logging.getLogger(__name__)
 
 # Initialize database
 init_db()
 
-app = FastAPI(title="Multi-Agent Discussion API")
+# Generated audio, referenced from messages
+audio_store = AudioStore(os.getenv("AUDIO_STORE_DIR", "./audio_store"))
+AUDIO_RETENTION_DAYS = int(os.getenv("AUDIO_RETENTION_DAYS", 0))  # 0 keeps audio forever
+AUDIO_GC_INTERVAL_HOURS = float(os.getenv("AUDIO_GC_INTERVAL_HOURS", 24))
+EXPORT_CONCURRENCY = int(os.getenv("EXPORT_CONCURRENCY", 3))  # Parallel syntheses of missing export segments
+EXPORT_READ_CHUNK = 64 * 1024
+
+def collect_audio_garbage():
+    """Run audio store retention and garbage collection"""
+    db = SessionLocal()
+    try:
+        result = audio_store.collect_garbage(db, retention_days=AUDIO_RETENTION_DAYS)
+        logger.info("Audio store GC: %s", result)
+    finally:
+        db.close()
+
+async def audio_gc_loop():
+    """Periodically collect unreferenced audio in the background"""
+    while True:
+        try:
+            await worker_pool.run(collect_audio_garbage)
+        except Exception as e:
+            logger.error("Audio store GC failed: %s", e)
+        await asyncio.sleep(AUDIO_GC_INTERVAL_HOURS * 3600)
+
+async def session_eviction_loop():
+    """Drop idle sessions every minute; they are rebuilt from the database when used again"""
+    while True:
+        await asyncio.sleep(60)
+        evicted = session_store.evict_idle()
+        if evicted:
+            logger.info("Evicted %d idle sessions", evicted)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Open shared clients on startup, close them on shutdown"""
+    worker_pool.start()
+    await fish_audio.start()
+    # Load the tokenizer off the event loop, it may be downloaded on first use
+    await worker_pool.run(count_tokens, "")
+    gc_task = asyncio.create_task(audio_gc_loop())
+    eviction_task = asyncio.create_task(session_eviction_loop())
+    yield
+    gc_task.cancel()
+    eviction_task.cancel()
+    await fish_audio.close()
+    await get_backend().close()
+    worker_pool.shutdown(wait=False)
+    stop_logging()
+
+app = FastAPI(title="Multi-Agent Discussion API", lifespan=lifespan)
 
 # Get project root directory
 import pathlib
@@ -46,20 +109,39 @@ app.add_middleware(
 # WebSocket connection manager
 class ConnectionManager:
     def __init__(self):
-        self.active_connections: List[WebSocket] = []
+        # Connections grouped by discussion id
+        self.active_connections: Dict[int, List[WebSocket]] = {}
 
-    async def connect(self, websocket: WebSocket):
+    async def connect(self, discussion_id: int, websocket: WebSocket):
         await websocket.accept()
-        self.active_connections.append(websocket)
-
-    def disconnect(self, websocket: WebSocket):
-        self.active_connections.remove(websocket)
+        self.active_connections.setdefault(discussion_id, []).append(websocket)
+
+    def disconnect(self, discussion_id: int, websocket: WebSocket):
+        connections = self.active_connections.get(discussion_id, [])
+        if websocket in connections:
+            connections.remove(websocket)
+        if not connections:
+            self.active_connections.pop(discussion_id, None)
+
+    async def broadcast(self, discussion_id: int, message: dict):
+        """Broadcast message to all clients connected to a discussion"""
+        connections = list(self.active_connections.get(discussion_id, []))
+        if not connections:
+            return
+        # Encode once for all clients
+        with timed("payload_encoding"):
+            text = json.dumps(message)
+        for connection in connections:
+            try:
+                await connection.send_text(text)
+            except:
+                pass
 
-    async def broadcast(self, message: dict):
-        """Broadcast message to all connected clients"""
-        for connection in self.active_connections:
+    async def broadcast_bytes(self, discussion_id: int, data: bytes):
+        """Broadcast binary frame to all clients connected to a discussion"""
+        for connection in list(self.active_connections.get(discussion_id, [])):
             try:
-                await connection.send_json(message)
+                await connection.send_bytes(data)
             except:
                 pass
 
@@ -68,7 +150,7 @@ manager = ConnectionManager()
 # Pydantic models
 class DiscussionCreate(BaseModel):
     topic: str
-    mode: str = "auto"  # Discussion mode: auto (intelligent selection) or round_robin (take turns)
+    mode: str = "auto"  # Discussion mode: auto (intelligent selection), round_robin (take turns), combined (one call per turn) or parallel (all agents draft)
 
 class DiscussionResponse(BaseModel):
     id: int
@@ -85,6 +167,7 @@ class MessageResponse(BaseModel):
     content: str
     timestamp: datetime
     message_type: str
+    audio_url: Optional[str] = None
 
     class Config:
         from_attributes = True
@@ -103,7 +186,7 @@ async def create_discussion(
     """Create new discussion"""
     db_discussion = Discussion(topic=discussion.topic)
     db.add(db_discussion)
-    db.commit()
+    commit(db)
     db.refresh(db_discussion)
     return db_discussion
 
@@ -141,64 +224,277 @@ async def get_messages(
     ).order_by(Message.timestamp.asc()).all()
     return messages
 
-# Store discussion sessions and role-voice mappings
-discussion_sessions = {}
+# Live discussion sessions, rebuilt from the database when evicted (see get_session)
+session_store = SessionStore(on_evict=lambda session: discard_prefetch(session))
 
-@app.post("/discussions/{discussion_id}/init")
-async def init_discussion(
-    discussion_id: int,
-    db: Session = Depends(get_db)
-):
-    """Initialize discussion and generate roles"""
-    discussion = db.query(Discussion).filter(Discussion.id == discussion_id).first()
-    if not discussion:
-        raise HTTPException(status_code=404, detail="Discussion not found")
+def commit(db: Session):
+    """Commit session, timed as db_commit"""
+    with timed("db_commit"):
+        db.commit()
 
-    # Generate discussion roles
-    from concurrent.futures import ThreadPoolExecutor
-    with ThreadPoolExecutor() as executor:
-        roles = await asyncio.get_event_loop().run_in_executor(
-            executor,
-            lambda: generate_discussion_roles(discussion.topic, num_roles=3)
-        )
+registry.gauge("brainstormer_sessions", "Discussions with an in-memory session", lambda: len(session_store))
+registry.gauge("brainstormer_session_memory_bytes", "Approximate size of in-memory sessions", session_store.memory_bytes)
+registry.gauge(
+    "brainstormer_websocket_connections", "Open discussion WebSocket connections",
+    lambda: sum(len(connections) for connections in manager.active_connections.values())
+)
+registry.gauge("brainstormer_worker_pool_active", "Worker pool calls running", lambda: worker_pool.active)
+registry.gauge("brainstormer_worker_pool_queued", "Worker pool calls waiting for a thread", lambda: worker_pool.queued)
+
+def finish_discussion(discussion_id: int, discussion: Discussion, db: Session):
+    """Mark discussion as completed and drop its session"""
+    discussion.status = "completed"
+    commit(db)
+    session = session_store.pop(discussion_id)
+    if session:
+        discard_prefetch(session)
+
+async def synthesize_message(agent_name: str, content: str, voice_id: str) -> Optional[bytes]:
+    """Generate TTS for a message, return MP3 audio or None"""
+    if not voice_id or not os.getenv("FISH_AUDIO_API_KEY"):
+        return None
 
-    # Assign voice to each role
-    role_voice_map = {}
-    for role in roles:
-        display_name = role.get("display_name", role["name"])
-        voice_id = select_voice_for_role(display_name, role.get("personality", ""))
-        role_voice_map[role["name"]] = voice_id
+    try:
+        return await synthesize_speech(content, voice_id)
+    except Exception as e:
+        logger.error("TTS generation failed for %s: %s", agent_name, e)
+        return None
+
+async def attach_audio(db: Session, message: Message, audio: Optional[bytes], voice_id: Optional[str]):
+    """Store audio in the audio store and reference it from message"""
+    message.voice_id = voice_id or None
+    if audio:
+        message.audio_hash = await worker_pool.run(audio_store.put, db, audio)
+
+async def compute_turn(session: dict) -> dict:
+    """
+    Select speaker, generate reply and its audio without recording the turn
+
+    The returned turn is only valid while the history revision it was
+    computed from is still current.
+    """
+    agent_system = session["agent_system"]
+    revision = agent_system.revision
+
+    agent_name, content = await agent_system.prepare_turn()
 
-    # Create discussion system
+    audio = None
+    voice_id = None
+    if agent_name is not None:
+        voice_id = session["role_voice_map"].get(agent_name, "")
+        audio = await synthesize_message(agent_name, content, voice_id)
+
+    return {
+        "revision": revision,
+        "agent": agent_name,
+        "content": content,
+        "voice_id": voice_id,
+        "audio": audio
+    }
+
+def start_prefetch(session: dict):
+    """Speculatively compute the next turn in the background"""
+    discard_prefetch(session)
+    agent_system = session["agent_system"]
+    if agent_system.current_turn >= agent_system.max_turns:
+        return
+
+    task = asyncio.create_task(compute_turn(session))
+    # Retrieve exceptions of turns that end up unused so they are not reported as lost
+    task.add_done_callback(lambda t: t.cancelled() or t.exception())
+    session["prefetch"] = task
+
+def discard_prefetch(session: dict):
+    """Throw away the speculative turn, e.g. because history changed"""
+    task = session.pop("prefetch", None)
+    if task:
+        task.cancel()
+
+async def take_prefetch(session: dict) -> Optional[dict]:
+    """Return the speculative turn if it is still valid for the current history"""
+    task = session.pop("prefetch", None)
+    if not task:
+        return None
+
+    try:
+        turn = await task
+    except asyncio.CancelledError:
+        return None
+    except Exception as e:
+        logger.warning("Speculative turn failed, recomputing: %s", e)
+        return None
+
+    if turn["revision"] != session["agent_system"].revision:
+        return None
+    return turn
+
+async def record_turn(discussion_id: int, session: dict, turn: dict, db: Session) -> Message:
+    """Save a computed turn, then add it to the discussion history and attach its audio"""
+    # Save to database first so the history never runs ahead of what a rebuilt session would see
+    message = Message(
+        discussion_id=discussion_id,
+        agent_name=turn["agent"],
+        content=turn["content"],
+        message_type="chat",
+        voice_id=turn["voice_id"] or None
+    )
+    db.add(message)
+    commit(db)
+
+    agent_system = session["agent_system"]
+    agent_system.commit_turn(turn["agent"], turn["content"])
+    logger.info("Turn %d of discussion %d: %s (%d characters)", agent_system.current_turn, discussion_id, turn["agent"], len(turn["content"]))
+
+    if turn["audio"]:
+        await attach_audio(db, message, turn["audio"], turn["voice_id"])
+        commit(db)
+    return message
+
+def build_agent_system(topic: str, roles: list) -> MultiAgentDiscussion:
+    """Create and initialize the agents of a discussion"""
     agent_system = MultiAgentDiscussion(
         message_callback=None,
         discussion_mode="auto",
         custom_roles=roles
     )
-    agent_system.init_discussion(discussion.topic)
+    agent_system.init_discussion(topic)
+    return agent_system
+
+def assign_voice(role: dict) -> str:
+    """Voice of a generated role"""
+    return select_voice_for_role(role.get("display_name", role["name"]), role.get("personality", ""))
+
+def public_role(role: dict) -> dict:
+    """Role fields shown to clients"""
+    return {
+        "name": role.get("display_name", role["name"]),
+        "stance": role["stance"],
+        "personality": role["personality"]
+    }
 
-    # Save to memory
-    discussion_sessions[discussion_id] = {
+def new_session(agent_system: MultiAgentDiscussion, roles: list, role_voice_map: dict) -> dict:
+    return {
         "agent_system": agent_system,
         "role_voice_map": role_voice_map,
-        "roles": roles
+        "roles": roles,
+        "turn_lock": asyncio.Lock()  # Serializes turns of this discussion
     }
 
-    # Update discussion status
+def start_session(discussion: Discussion, roles: list, role_voice_map: dict) -> dict:
+    """
+    Create the discussion system for roles and start its first turn
+
+    The setup is also saved on the discussion, so the session can be
+    rebuilt after eviction or a restart; the caller commits it.
+    """
+    # Assign voices not assigned while roles were streamed
+    for role in roles:
+        if role["name"] not in role_voice_map:
+            role_voice_map[role["name"]] = assign_voice(role)
+
+    agent_system = build_agent_system(discussion.topic, roles)
+    session = new_session(agent_system, roles, role_voice_map)
+    # Replaces a previous initialization
+    session_store.put(discussion.id, session)
+
     discussion.status = "running"
-    db.commit()
+    discussion.mode = agent_system.discussion_mode
+    discussion.roles = json.dumps(roles, ensure_ascii=False)
+    discussion.voices = json.dumps(role_voice_map)
+
+    # Start the first turn right away; /next_turn or the socket picks it up
+    start_prefetch(session)
+    return session
+
+def get_session(db: Session, discussion: Discussion) -> Optional[dict]:
+    """
+    Session of a discussion, rebuilt from its saved setup and messages if not in memory
+
+    None if the discussion was never initialized or is no longer running.
+    """
+    session = session_store.get(discussion.id)
+    if session is not None or discussion.status != "running" or not discussion.roles:
+        return session
+
+    roles = json.loads(discussion.roles)
+    agent_system = build_agent_system(discussion.topic, roles)
+    agent_system.discussion_mode = discussion.mode or "auto"
+    messages = db.query(Message.agent_name, Message.content).filter(
+        Message.discussion_id == discussion.id,
+        Message.message_type.in_(("chat", "user"))
+    ).order_by(Message.id).all()
+    agent_system.restore_history(messages)
+
+    session = new_session(agent_system, roles, json.loads(discussion.voices or "{}"))
+    session_store.put(discussion.id, session)
+    session_store.restored += 1
+    logger.info("Restored session of discussion %d from %d messages", discussion.id, len(messages))
+    return session
+
+def sse_event(event: str, data: dict) -> str:
+    """One server-sent event"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+@app.post("/discussions/{discussion_id}/init")
+async def init_discussion(
+    discussion_id: int,
+    stream: bool = False,
+    db: Session = Depends(get_db)
+):
+    """
+    Initialize discussion and generate roles
+
+    With stream=true the response is a server-sent event stream: a "role"
+    event per persona as soon as it is generated, then "ready" with the
+    same body as the plain response once the discussion can start.
+    """
+    discussion = db.query(Discussion).filter(Discussion.id == discussion_id).first()
+    if not discussion:
+        raise HTTPException(status_code=404, detail="Discussion not found")
+
+    if stream:
+        return StreamingResponse(
+            stream_init(discussion_id),
+            media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+        )
+
+    # Reuse roles of the same or a similar topic, generate them otherwise
+    roles = await role_cache.get_roles(db, discussion.topic, num_roles=3)
+    session = start_session(discussion, roles, {})
+    commit(db)
 
     return {
-        "roles": [
-            {
-                "name": role.get("display_name", role["name"]),
-                "stance": role["stance"],
-                "personality": role["personality"]
-            }
-            for role in roles
-        ]
+        "roles": [public_role(role) for role in roles],
+        "first_turn": "in_progress" if "prefetch" in session else None
     }
 
+async def stream_init(discussion_id: int):
+    """Server-sent events of /init?stream=true"""
+    # Own session, the request's one is closed once streaming starts
+    db = SessionLocal()
+    try:
+        discussion = db.query(Discussion).filter(Discussion.id == discussion_id).first()
+        roles = []
+        role_voice_map = {}
+        async for role in role_cache.stream_roles(db, discussion.topic, num_roles=3):
+            roles.append(role)
+            role_voice_map[role["name"]] = assign_voice(role)
+            yield sse_event("role", public_role(role))
+
+        session = start_session(discussion, roles, role_voice_map)
+        commit(db)
+
+        yield sse_event("ready", {
+            "roles": [public_role(role) for role in roles],
+            "first_turn": "in_progress" if "prefetch" in session else None
+        })
+    except Exception as e:
+        logger.error("Streaming initialization of discussion %d failed: %s", discussion_id, e)
+        yield sse_event("error", {"detail": str(e)})
+    finally:
+        db.close()
+
 class UserMessageRequest(BaseModel):
     content: str
     voice_id: Optional[str] = None  # User selected voice ID
@@ -213,12 +509,15 @@ async def update_mode(
     db: Session = Depends(get_db)
 ):
     """Update discussion mode"""
+    if request.mode not in DISCUSSION_MODES:
+        raise HTTPException(status_code=400, detail=f"Unknown mode, expected one of: {', '.join(DISCUSSION_MODES)}")
+
     discussion = db.query(Discussion).filter(Discussion.id == discussion_id).first()
     if not discussion:
         raise HTTPException(status_code=404, detail="Discussion not found")
 
     # Get session
-    session = discussion_sessions.get(discussion_id)
+    session = get_session(db, discussion)
     if not session:
         raise HTTPException(status_code=400, detail="Discussion not initialized")
 
@@ -226,6 +525,12 @@ async def update_mode(
 
     # Update mode
     agent_system.discussion_mode = request.mode
+    discussion.mode = request.mode
+    commit(db)
+
+    # Speculative turn was selected with the old mode
+    if "prefetch" in session:
+        start_prefetch(session)
 
     return {"status": "ok", "mode": request.mode}
 
@@ -241,39 +546,46 @@ async def user_message(
         raise HTTPException(status_code=404, detail="Discussion not found")
 
     # Get session
-    session = discussion_sessions.get(discussion_id)
+    session = get_session(db, discussion)
     if not session:
         raise HTTPException(status_code=400, detail="Discussion not initialized")
 
     agent_system = session["agent_system"]
 
-    # Add user message to discussion history
-    agent_system.add_user_message(message.content)
-
-    # Save to database
+    # Save to database first, audio is attached once synthesized
     db_message = Message(
         discussion_id=discussion_id,
         agent_name="You",
         content=message.content,
-        message_type="user"
+        message_type="user",
+        voice_id=message.voice_id or None
     )
     db.add(db_message)
-    db.commit()
+    commit(db)
+
+    # Add user message to discussion history
+    agent_system.add_user_message(message.content)
+
+    # Speculative turn did not see this message: recompute it
+    if "prefetch" in session:
+        start_prefetch(session)
 
     # Generate TTS for user message (if voice_id provided)
-    audio_base64 = None
+    audio = None
     if message.voice_id and os.getenv("FISH_AUDIO_API_KEY"):
         try:
-            print(f"🎤 Generating user message TTS: ({len(message.content)}characters)")
-            audio_base64 = await generate_tts(message.content, message.voice_id)
-            if audio_base64:
-                print(f"✅ User TTS generation completed")
+            audio = await synthesize_speech(message.content, message.voice_id)
         except Exception as e:
-            print(f"❌ User TTS generation failed: {e}")
+            logger.error("User TTS generation failed: %s", e)
+
+    if audio:
+        await attach_audio(db, db_message, audio, message.voice_id)
+        commit(db)
 
     return {
         "status": "ok",
-        "audio": audio_base64,
+        "message_id": db_message.id,
+        "audio_url": db_message.audio_url,
         "timestamp": datetime.utcnow().isoformat()
     }
 
@@ -288,60 +600,423 @@ async def next_turn(
         raise HTTPException(status_code=404, detail="Discussion not found")
 
     # Get session
-    session = discussion_sessions.get(discussion_id)
+    session = get_session(db, discussion)
     if not session:
         raise HTTPException(status_code=400, detail="Discussion not initialized")
 
     agent_system = session["agent_system"]
+
+    async with session["turn_lock"]:
+        # Use the speculative turn if nothing changed since it was started,
+        # otherwise compute it now; retry if history changes meanwhile
+        while True:
+            turn = await take_prefetch(session) or await compute_turn(session)
+            if turn["revision"] == agent_system.revision:
+                break
+
+        agent_name = turn["agent"]
+        content = turn["content"]
+
+        # Discussion ended
+        if agent_name is None:
+            finish_discussion(discussion_id, discussion, db)
+            return {"status": "finished"}
+
+        message = await record_turn(discussion_id, session, turn, db)
+
+        # Start on the following turn while the client plays this one
+        start_prefetch(session)
+
+    return {
+        "status": "ongoing",
+        "message_id": message.id,
+        "agent": agent_name,
+        "content": content,
+        "audio_url": message.audio_url,
+        "timestamp": datetime.utcnow().isoformat()
+    }
+
+@app.websocket("/ws/discussions/{discussion_id}")
+async def discussion_stream(websocket: WebSocket, discussion_id: int):
+    """
+    Stream turns of a discussion
+
+    Client sends {"action": "next_turn"}; server pushes "speaker", then
+    "token" events as the reply is generated, then "audio" (with the
+    message audio URL) and "done".
+    With {"action": "next_turn", "tts": "sentences"} the reply is synthesized
+    sentence by sentence while it streams, and each sentence's MP3 is pushed
+    in order as a binary frame (4-byte big-endian chunk index + MP3 bytes)
+    instead of the "audio" event.
+    """
+    await manager.connect(discussion_id, websocket)
+    try:
+        while True:
+            try:
+                request = json.loads(await websocket.receive_text())
+            except ValueError:
+                await websocket.send_text(json.dumps({"type": "error", "detail": "Invalid JSON"}))
+                continue
+            if isinstance(request, dict) and request.get("action") == "next_turn":
+                await stream_turn(discussion_id, tts_mode=request.get("tts", "full"))
+    except WebSocketDisconnect:
+        pass
+    finally:
+        manager.disconnect(discussion_id, websocket)
+
+async def stream_turn(discussion_id: int, tts_mode: str = "full"):
+    """Execute next turn and broadcast its progress to the discussion's clients"""
+    db = SessionLocal()
+    try:
+        discussion = db.query(Discussion).filter(Discussion.id == discussion_id).first()
+        if not discussion:
+            await manager.broadcast(discussion_id, {"type": "error", "detail": "Discussion not found"})
+            return
+
+        session = get_session(db, discussion)
+        if not session:
+            await manager.broadcast(discussion_id, {"type": "error", "detail": "Discussion not initialized"})
+            return
+
+        async with session["turn_lock"]:
+            # A speculative turn that is already complete is sent as is. One
+            # still being computed is dropped: streaming a new turn gets the
+            # first words (and sentence audio) out sooner than waiting for it
+            task = session.get("prefetch")
+            if task and not task.done():
+                discard_prefetch(session)
+            turn = await take_prefetch(session)
+            if turn:
+                await broadcast_prepared_turn(discussion_id, discussion, session, db, turn)
+            else:
+                await stream_session_turn(discussion_id, discussion, session, db, tts_mode)
+
+            # As after /next_turn, compute the following turn while clients play this one
+            if discussion.status == "running":
+                start_prefetch(session)
+    except Exception as e:
+        # One failed turn must not end the socket's receive loop
+        db.rollback()
+        logger.exception("Streamed turn of discussion %d failed", discussion_id)
+        await manager.broadcast(discussion_id, {"type": "error", "detail": str(e)})
+    finally:
+        db.close()
+
+async def broadcast_prepared_turn(discussion_id: int, discussion: Discussion, session: dict, db: Session, turn: dict):
+    """Record a turn computed ahead and send it to the discussion's clients in one piece"""
+    if turn["agent"] is None:
+        finish_discussion(discussion_id, discussion, db)
+        await manager.broadcast(discussion_id, {"type": "finished"})
+        return
+
+    await manager.broadcast(discussion_id, {"type": "speaker", "agent": turn["agent"]})
+    await manager.broadcast(discussion_id, {"type": "token", "delta": turn["content"]})
+    message = await record_turn(discussion_id, session, turn, db)
+    await manager.broadcast(discussion_id, {"type": "audio", "audio_url": message.audio_url})
+    await manager.broadcast(discussion_id, {
+        "type": "done",
+        "message_id": message.id,
+        "audio_url": message.audio_url,
+        "agent": turn["agent"],
+        "content": turn["content"],
+        "timestamp": datetime.utcnow().isoformat()
+    })
+
+async def stream_session_turn(discussion_id: int, discussion: Discussion, session: dict, db: Session, tts_mode: str):
+    """Stream one turn of an initialized session"""
+    agent_system = session["agent_system"]
     role_voice_map = session["role_voice_map"]
 
-    # Execute next_turn in thread pool
-    from concurrent.futures import ThreadPoolExecutor
-    with ThreadPoolExecutor() as executor:
-        future = executor.submit(agent_system.next_turn)
-        agent_name, content = await asyncio.get_event_loop().run_in_executor(
-            None, future.result
-        )
+    tts_enabled = bool(os.getenv("FISH_AUDIO_API_KEY"))
+    agent_name = None
+    parts = []
+    error = None
+    # Sentence mode: completed sentences feed chunk synthesis while tokens stream
+    splitter = None
+    sentences = None
+    chunk_task = None
+    try:
+        async for kind, value in agent_system.stream_next_turn():
+            if kind == "speaker":
+                agent_name = value
+                await manager.broadcast(discussion_id, {"type": "speaker", "agent": agent_name})
+                voice_id = role_voice_map.get(agent_name, "")
+                if tts_mode == "sentences" and voice_id and tts_enabled:
+                    splitter = SentenceSplitter()
+                    sentences = asyncio.Queue()
+                    chunk_task = asyncio.create_task(
+                        broadcast_audio_chunks(discussion_id, sentences, voice_id)
+                    )
+            elif kind == "token":
+                parts.append(value)
+                await manager.broadcast(discussion_id, {"type": "token", "delta": value})
+                if splitter:
+                    for sentence in splitter.feed(value):
+                        sentences.put_nowait(sentence)
+    except Exception as e:
+        error = str(e)
+
+    if error:
+        if chunk_task:
+            chunk_task.cancel()
+        logger.error("Streaming turn failed: %s", error)
+        await manager.broadcast(discussion_id, {"type": "error", "detail": error})
+        return
 
     # Discussion ended
     if agent_name is None:
-        discussion.status = "completed"
-        db.commit()
-        del discussion_sessions[discussion_id]
-        return {"status": "finished"}
+        finish_discussion(discussion_id, discussion, db)
+        await manager.broadcast(discussion_id, {"type": "finished"})
+        return
 
-    print(f"💬 [{agent_name}]: {content[:50]}...")
+    content = "".join(parts)
 
-    # Save to database
+    # Save to database first, as record_turn does, then add the turn to the history
+    voice_id = role_voice_map.get(agent_name, "")
     message = Message(
         discussion_id=discussion_id,
         agent_name=agent_name,
         content=content,
-        message_type="chat"
+        message_type="chat",
+        voice_id=voice_id or None
     )
     db.add(message)
-    db.commit()
+    try:
+        commit(db)
+    except Exception:
+        if chunk_task:
+            chunk_task.cancel()
+        raise
+    agent_system.commit_turn(agent_name, content)
+    logger.info("Turn %d of discussion %d: %s (%d characters)", agent_system.current_turn, discussion_id, agent_name, len(content))
+
+    if chunk_task:
+        # Remaining text is the last sentence, then wait for all chunks to be sent
+        for sentence in splitter.flush():
+            sentences.put_nowait(sentence)
+        sentences.put_nowait(None)
+        chunks = await chunk_task
+        if all(audio for _, audio in chunks):
+            # MP3 frames concatenate, keep the whole reply for replay
+            audio = b"".join(audio for _, audio in chunks)
+        else:
+            # A sentence is missing from the chunks, store the reply synthesized in one piece instead
+            logger.warning("%d of %d sentence chunks failed, synthesizing the whole reply", sum(not audio for _, audio in chunks), len(chunks))
+            audio = await synthesize_message(agent_name, content, voice_id)
+        await attach_audio(db, message, audio, voice_id)
+        commit(db)
+    else:
+        # Generate TTS
+        await attach_audio(db, message, await synthesize_message(agent_name, content, voice_id), voice_id)
+        commit(db)
+        await manager.broadcast(discussion_id, {"type": "audio", "audio_url": message.audio_url})
+
+    await manager.broadcast(discussion_id, {
+        "type": "done",
+        "message_id": message.id,
+        "audio_url": message.audio_url,
+        "agent": agent_name,
+        "content": content,
+        "timestamp": datetime.utcnow().isoformat()
+    })
+
+async def broadcast_audio_chunks(discussion_id: int, sentences: asyncio.Queue, voice_id: str) -> List[Tuple[str, Optional[bytes]]]:
+    """
+    Synthesize sentences from queue (None ends it) and broadcast audio chunks in order
+
+    Returns:
+        list: (sentence, audio) of every chunk in order, audio None if it failed
+    """
+    async def drain():
+        while True:
+            sentence = await sentences.get()
+            if sentence is None:
+                return
+            yield sentence
+
+    chunks = []
+    async for index, sentence, audio in generate_tts_chunks(drain(), voice_id):
+        chunks.append((sentence, audio))
+        if audio:
+            await manager.broadcast_bytes(discussion_id, index.to_bytes(4, "big") + audio)
+    return chunks
+
+@app.get("/discussions/{discussion_id}/export.mp3")
+async def export_discussion(
+    discussion_id: int,
+    silence_ms: int = 600,
+    db: Session = Depends(get_db)
+):
+    """
+    Export discussion as one MP3, streamed segment by segment
+
+    Stored message audio is streamed in order, with silence_ms of silence
+    whenever the speaker changes. Messages that have a voice but no audio
+    are synthesized (at most EXPORT_CONCURRENCY at a time, ahead of the
+    stream position) and stored so the next export does not repeat it.
+    """
+    discussion = db.query(Discussion).filter(Discussion.id == discussion_id).first()
+    if not discussion:
+        raise HTTPException(status_code=404, detail="Discussion not found")
 
-    # Get voice and generate TTS
-    voice_id = role_voice_map.get(agent_name, "")
-    audio_base64 = None
+    # Only what is needed to plan the export, not the audio itself
+    segments = db.query(
+        Message.id, Message.agent_name, Message.content, Message.voice_id, Message.audio_hash
+    ).filter(
+        Message.discussion_id == discussion_id
+    ).order_by(Message.timestamp.asc()).all()
 
-    if voice_id and os.getenv("FISH_AUDIO_API_KEY"):
-        try:
-            print(f"🎤 Generating TTS: {agent_name} ({len(content)}characters)")
-            audio_base64 = await generate_tts(content, voice_id)
-            print(f"✅ TTS generation completed")
-        except Exception as e:
-            print(f"❌ TTS generation failed: {e}")
+    silence = mp3_silence(max(0, min(silence_ms, 10000)))
+    filename = f"discussion-{discussion_id}.mp3"
+    return StreamingResponse(
+        stream_export(segments, silence),
+        media_type="audio/mpeg",
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+async def stream_export(segments: list, silence: bytes):
+    """Yield export audio chunk by chunk, synthesizing missing segments ahead of time"""
+    tts_enabled = bool(os.getenv("FISH_AUDIO_API_KEY"))
+    semaphore = asyncio.Semaphore(EXPORT_CONCURRENCY)
+    pending = {}  # index -> task synthesizing a missing segment
+
+    async def synthesize_missing(segment):
+        async with semaphore:
+            audio = await synthesize_speech(segment.content, segment.voice_id)
+        if not audio:
+            return None
 
+        # Persist so later exports and playback reuse it
+        db = SessionLocal()
+        try:
+            audio_hash = await worker_pool.run(audio_store.put, db, audio)
+            db.query(Message).filter(Message.id == segment.id).update({Message.audio_hash: audio_hash})
+            commit(db)
+        finally:
+            db.close()
+        return audio_hash
+
+    def schedule(start: int):
+        # Keep up to EXPORT_CONCURRENCY missing segments in flight ahead of position
+        for index in range(start, len(segments)):
+            if len(pending) >= EXPORT_CONCURRENCY:
+                break
+            segment = segments[index]
+            if index not in pending and not segment.audio_hash and segment.voice_id and tts_enabled:
+                pending[index] = asyncio.create_task(synthesize_missing(segment))
+
+    previous_speaker = None
+    try:
+        for index, segment in enumerate(segments):
+            schedule(index)
+            audio_hash = segment.audio_hash
+            if index in pending:
+                audio_hash = await pending.pop(index)
+                schedule(index)
+            if not audio_hash:
+                continue
+
+            if previous_speaker is not None and segment.agent_name != previous_speaker:
+                yield silence
+            previous_speaker = segment.agent_name
+
+            # Read the stored segment piece by piece, never holding the whole export
+            size = audio_store.size(audio_hash) or 0
+            for start in range(0, size, EXPORT_READ_CHUNK):
+                end = min(start + EXPORT_READ_CHUNK, size) - 1
+                yield await worker_pool.run(audio_store.read, audio_hash, start, end)
+    finally:
+        for task in pending.values():
+            task.cancel()
+
+@app.get("/messages/{message_id}/audio")
+async def get_message_audio(
+    message_id: int,
+    request: Request,
+    db: Session = Depends(get_db)
+):
+    """Serve message audio, supporting conditional and range requests"""
+    message = db.query(Message).filter(Message.id == message_id).first()
+    size = audio_store.size(message.audio_hash) if message and message.audio_hash else None
+    if size is None:
+        raise HTTPException(status_code=404, detail="Audio not found")
+
+    # Blobs are content-addressed, so the hash is a strong validator
+    etag = f'"{message.audio_hash}"'
+    headers = {
+        "ETag": etag,
+        "Accept-Ranges": "bytes",
+        # Audio of a message never changes
+        "Cache-Control": "public, max-age=31536000, immutable"
+    }
+    if etag in request.headers.get("if-none-match", ""):
+        return Response(status_code=304, headers=headers)
+
+    byte_range = parse_range(request.headers.get("range"), size)
+    if byte_range is None:
+        audio = await worker_pool.run(audio_store.read, message.audio_hash)
+        return Response(content=audio, media_type="audio/mpeg", headers=headers)
+    if byte_range == "unsatisfiable":
+        return Response(status_code=416, headers={**headers, "Content-Range": f"bytes */{size}"})
+
+    start, end = byte_range
+    audio = await worker_pool.run(audio_store.read, message.audio_hash, start, end)
+    headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+    return Response(content=audio, status_code=206, media_type="audio/mpeg", headers=headers)
+
+def parse_range(header: Optional[str], size: int):
+    """
+    Parse a single-range "Range: bytes=..." header
+
+    Returns:
+        (start, end) inclusive, None to serve the whole body, or "unsatisfiable"
+    """
+    if not header or not header.startswith("bytes=") or "," in header:
+        return None
+
+    start_text, _, end_text = header[len("bytes="):].strip().partition("-")
+    try:
+        if not start_text:
+            # Suffix range: last N bytes
+            length = int(end_text)
+            if length <= 0:
+                return "unsatisfiable"
+            return max(size - length, 0), size - 1
+        start = int(start_text)
+        end = int(end_text) if end_text else size - 1
+    except ValueError:
+        return None
+
+    if start >= size or end < start:
+        return "unsatisfiable"
+    return start, min(end, size - 1)
+
+@app.get("/stats")
+async def get_stats(db: Session = Depends(get_db)):
+    """Get runtime statistics"""
+    backend = get_backend()
     return {
-        "status": "ongoing",
-        "agent": agent_name,
-        "content": content,
-        "audio": audio_base64,
-        "timestamp": datetime.utcnow().isoformat()
+        "sessions": session_store.stats(),
+        "workers": worker_pool.stats(),
+        "speaker_selection": selection_stats,
+        "turns": turn_stats,
+        "summary": summary_stats,
+        "context": context_stats,
+        "role_cache": role_cache.stats(),
+        "llm_cache": backend.stats() if isinstance(backend, RecordReplayBackend) else None,
+        "tts_cache": tts_cache.stats(),
+        "audio_store": audio_store.stats(db),
+        "fish_audio": {
+            "retries": fish_audio.retries,
+            "retry_budget": fish_audio.retry_budget.tokens
+        }
     }
 
+@app.get("/metrics")
+async def get_metrics():
+    """Stage latency histograms and session gauges in Prometheus text format"""
+    return Response(content=registry.render(), media_type="text/plain; version=0.0.4")
+
 @app.get("/voices")
 async def get_voices():
     """Get available voice list"""
@@ -399,7 +1074,7 @@ async def clone_voice(
     except HTTPException:
         raise
     except Exception as e:
-        print(f"Error in clone_voice endpoint: {e}")
+        logger.error("Error in clone_voice endpoint: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 if __name__ == "__main__":
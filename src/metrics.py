@@ -0,0 +1,140 @@
+"""
+Metrics - Per-stage latency histograms in Prometheus text format, and non-blocking logging
+"""
+import os
+import sys
+import time
+import queue
+import logging
+import logging.handlers
+import threading
+from contextlib import contextmanager
+from typing import Callable, Dict, Optional, Tuple
+
+# Upper bounds of latency histogram buckets, seconds
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    pairs = []
+    for name, value in labels.items():
+        value = str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        pairs.append(f'{name}="{value}"')
+    return "{" + ",".join(pairs) + "}"
+
+
+class Histogram:
+    """Cumulative histogram with one series per label value, safe to observe from worker threads"""
+
+    def __init__(self, name: str, help_text: str, label: str, buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.label = label
+        self.buckets = buckets
+        self._series = {}  # label value -> [bucket counts..., count, sum]
+        self._lock = threading.Lock()
+
+    def observe(self, label_value: str, value: float):
+        with self._lock:
+            series = self._series.setdefault(label_value, [0] * len(self.buckets) + [0, 0.0])
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+            series[-2] += 1
+            series[-1] += value
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for label_value, series in sorted(self._series.items()):
+                for bound, count in zip(self.buckets, series):
+                    labels = _format_labels({self.label: label_value, "le": repr(bound)})
+                    lines.append(f"{self.name}_bucket{labels} {count}")
+                lines.append(f"{self.name}_bucket{_format_labels({self.label: label_value, 'le': '+Inf'})} {series[-2]}")
+                lines.append(f"{self.name}_count{_format_labels({self.label: label_value})} {series[-2]}")
+                lines.append(f"{self.name}_sum{_format_labels({self.label: label_value})} {series[-1]}")
+        return lines
+
+
+class Registry:
+    """Histograms plus gauges read from callbacks at scrape time"""
+
+    def __init__(self):
+        self.histograms = []
+        self.gauges = []  # (name, help, callback returning a number)
+
+    def histogram(self, name: str, help_text: str, label: str) -> Histogram:
+        histogram = Histogram(name, help_text, label)
+        self.histograms.append(histogram)
+        return histogram
+
+    def gauge(self, name: str, help_text: str, callback: Callable[[], float]):
+        self.gauges.append((name, help_text, callback))
+
+    def render(self) -> str:
+        """All metrics in Prometheus text exposition format"""
+        lines = []
+        for histogram in self.histograms:
+            lines.extend(histogram.render())
+        for name, help_text, callback in self.gauges:
+            lines.extend([f"# HELP {name} {help_text}", f"# TYPE {name} gauge", f"{name} {callback()}"])
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+# Stages: role_generation, role_cache_lookup, speaker_selection, reply_generation, summary, db_commit,
+# tts_request, payload_encoding
+stage_seconds = registry.histogram(
+    "brainstormer_stage_seconds",
+    "Duration of processing stages",
+    "stage"
+)
+
+
+@contextmanager
+def timed(stage: str):
+    """Record the duration of the enclosed block, also when it raises, in stage_seconds"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        stage_seconds.observe(stage, time.perf_counter() - started)
+
+
+_log_listener: Optional[logging.handlers.QueueListener] = None
+
+
+def setup_logging():
+    """
+    Send log records through a queue to a background thread that writes them
+
+    Callers on the event loop only enqueue the record; formatting and
+    writing to stdout happen off the request path. Level from LOG_LEVEL.
+    """
+    global _log_listener
+    if _log_listener is not None:
+        return
+
+    records = queue.SimpleQueue()
+    output = logging.StreamHandler(sys.stdout)
+    output.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+
+    root = logging.getLogger()
+    root.setLevel(os.getenv("LOG_LEVEL", "INFO").upper())
+    root.addHandler(logging.handlers.QueueHandler(records))
+    # One line per outgoing request is too much for the hot path
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+
+    _log_listener = logging.handlers.QueueListener(records, output, respect_handler_level=True)
+    _log_listener.start()
+
+
+def stop_logging():
+    """Flush queued log records and stop the writer thread"""
+    global _log_listener
+    if _log_listener is not None:
+        _log_listener.stop()
+        _log_listener = None
@@ -0,0 +1,228 @@
+"""
+Role Cache - Generated personas reused for the same or nearly the same topic
+"""
+import os
+import re
+import json
+import time
+import random
+import asyncio
+import hashlib
+import logging
+from datetime import datetime, timedelta
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from database import RoleSet, SessionLocal
+from metrics import timed
+from role_generator import FALLBACK_ROLES, generate_discussion_roles, stream_discussion_roles
+
+logger = logging.getLogger(__name__)
+
+# Shingle overlap (Jaccard) from which a stored topic counts as the same topic, above 1 matches exact topics only
+ROLE_CACHE_SIMILARITY = float(os.getenv("ROLE_CACHE_SIMILARITY", 0.7))
+# Regenerate roles served from the cache in the background when older than this (0 never refreshes)
+ROLE_CACHE_REFRESH_HOURS = float(os.getenv("ROLE_CACHE_REFRESH_HOURS", 0))
+
+SHINGLE_SIZE = 3  # Characters per shingle
+MINHASH_BANDS = 20
+MINHASH_ROWS = 3  # Rows per band; 20 x 3 finds pairs at 0.7 similarity with ~99.9% probability
+_PRIME = (1 << 61) - 1
+_seeds = random.Random(0x601E5)
+_PERMUTATIONS = [
+    (_seeds.randrange(1, _PRIME), _seeds.randrange(0, _PRIME))
+    for _ in range(MINHASH_BANDS * MINHASH_ROWS)
+]
+
+
+def normalize_topic(topic: str) -> str:
+    """Lowercase topic without punctuation and repeated whitespace"""
+    return " ".join(re.sub(r"[^\w\s]", " ", topic.lower()).split())
+
+
+def shingles(topic_key: str) -> frozenset:
+    """Character n-grams of a normalized topic"""
+    if len(topic_key) <= SHINGLE_SIZE:
+        return frozenset([topic_key])
+    return frozenset(topic_key[i:i + SHINGLE_SIZE] for i in range(len(topic_key) - SHINGLE_SIZE + 1))
+
+
+def minhash(shingle_set: frozenset) -> Tuple[int, ...]:
+    """MinHash signature of a shingle set"""
+    hashes = [
+        int.from_bytes(hashlib.blake2b(shingle.encode("utf-8"), digest_size=8).digest(), "big")
+        for shingle in shingle_set
+    ]
+    return tuple(min((a * h + b) % _PRIME for h in hashes) for a, b in _PERMUTATIONS)
+
+
+def _bands(signature: Tuple[int, ...]):
+    for band in range(MINHASH_BANDS):
+        yield band, signature[band * MINHASH_ROWS:(band + 1) * MINHASH_ROWS]
+
+
+class RoleCache:
+    """
+    Role sets stored in the role_sets table, looked up by topic
+
+    An exact match of the normalized topic is tried first. Otherwise
+    MinHash/LSH over character shingles yields stored topics that likely
+    overlap, and the best one whose Jaccard similarity reaches
+    ROLE_CACHE_SIMILARITY is served. The index is kept in memory and
+    loaded from the database on first use.
+    """
+
+    def __init__(self, similarity: float = ROLE_CACHE_SIMILARITY, refresh_hours: float = ROLE_CACHE_REFRESH_HOURS):
+        self.similarity = similarity
+        self.refresh_hours = refresh_hours
+        self._entries: Optional[Dict[Tuple[int, str], dict]] = None  # (num_roles, topic_key) -> entry
+        self._buckets: Dict[tuple, set] = {}  # (num_roles, band, rows) -> entry keys
+        self._refreshing = set()
+        self._tasks = set()
+        self.hits_exact = 0
+        self.hits_similar = 0
+        self.misses = 0
+        self.refreshes = 0
+        self.lookup_seconds = 0.0
+
+    def _load(self, db: Session):
+        self._entries = {}
+        for role_set in db.query(RoleSet).all():
+            self._index(role_set)
+
+    def _index(self, role_set: RoleSet):
+        key = (role_set.num_roles, role_set.topic_key)
+        shingle_set = shingles(role_set.topic_key)
+        self._entries[key] = {
+            "id": role_set.id,
+            "topic": role_set.topic,
+            "roles": json.loads(role_set.roles),
+            "updated_at": role_set.updated_at,
+            "shingles": shingle_set
+        }
+        for band, rows in _bands(minhash(shingle_set)):
+            self._buckets.setdefault((role_set.num_roles, band, rows), set()).add(key)
+
+    def _similar(self, num_roles: int, topic_key: str) -> Optional[dict]:
+        """Most similar stored entry at or above the similarity threshold"""
+        shingle_set = shingles(topic_key)
+        candidates = set()
+        for band, rows in _bands(minhash(shingle_set)):
+            candidates |= self._buckets.get((num_roles, band, rows), set())
+
+        best, best_score = None, self.similarity
+        for key in candidates:
+            stored = self._entries[key]["shingles"]
+            score = len(shingle_set & stored) / len(shingle_set | stored)
+            if score >= best_score:
+                best, best_score = self._entries[key], score
+        return best
+
+    def lookup(self, db: Session, topic: str, num_roles: int) -> Optional[List[dict]]:
+        """Stored roles for topic, None on a miss"""
+        started = time.perf_counter()
+        with timed("role_cache_lookup"):
+            if self._entries is None:
+                self._load(db)
+            topic_key = normalize_topic(topic)
+            entry = self._entries.get((num_roles, topic_key))
+            if entry is not None:
+                self.hits_exact += 1
+            elif self.similarity <= 1:
+                entry = self._similar(num_roles, topic_key)
+                if entry is not None:
+                    self.hits_similar += 1
+            if entry is None:
+                self.misses += 1
+        self.lookup_seconds += time.perf_counter() - started
+
+        if entry is None:
+            return None
+        self._maybe_refresh(entry, num_roles)
+        return [dict(role) for role in entry["roles"]]
+
+    def store(self, db: Session, topic: str, num_roles: int, roles: List[dict]) -> bool:
+        """Save generated roles for topic; fallback roles and incomplete sets are not cached"""
+        if roles == FALLBACK_ROLES or len(roles) < num_roles:
+            return False
+        if self._entries is None:
+            self._load(db)
+        topic_key = normalize_topic(topic)
+        role_set = db.query(RoleSet).filter(RoleSet.topic_key == topic_key, RoleSet.num_roles == num_roles).first()
+        if role_set is None:
+            role_set = RoleSet(topic_key=topic_key, num_roles=num_roles)
+            db.add(role_set)
+        role_set.topic = topic
+        role_set.roles = json.dumps(roles, ensure_ascii=False)
+        role_set.updated_at = datetime.utcnow()
+        with timed("db_commit"):
+            db.commit()
+        self._index(role_set)
+        return True
+
+    async def get_roles(self, db: Session, topic: str, num_roles: int = 3) -> List[dict]:
+        """Cached roles for topic, generated and stored on a miss"""
+        roles = self.lookup(db, topic, num_roles)
+        if roles is None:
+            roles = await generate_discussion_roles(topic, num_roles=num_roles)
+            self.store(db, topic, num_roles, roles)
+        return roles
+
+    async def stream_roles(self, db: Session, topic: str, num_roles: int = 3) -> AsyncIterator[dict]:
+        """Like get_roles, yielding each generated role as soon as it is complete"""
+        roles = self.lookup(db, topic, num_roles)
+        if roles is not None:
+            for role in roles:
+                yield role
+            return
+
+        roles = []
+        async for role in stream_discussion_roles(topic, num_roles=num_roles):
+            roles.append(role)
+            yield role
+        # A stream cut short leaves fewer roles, keep those out of the cache
+        if len(roles) == num_roles:
+            self.store(db, topic, num_roles, roles)
+
+    def _maybe_refresh(self, entry: dict, num_roles: int):
+        if not self.refresh_hours or entry["id"] in self._refreshing:
+            return
+        if datetime.utcnow() - entry["updated_at"] < timedelta(hours=self.refresh_hours):
+            return
+        self._refreshing.add(entry["id"])
+        task = asyncio.create_task(self._refresh(entry, num_roles))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _refresh(self, entry: dict, num_roles: int):
+        """Regenerate an entry's roles; discussions already using the old ones keep them"""
+        try:
+            roles = await generate_discussion_roles(entry["topic"], num_roles=num_roles)
+            db = SessionLocal()
+            try:
+                if self.store(db, entry["topic"], num_roles, roles):
+                    self.refreshes += 1
+            finally:
+                db.close()
+        except Exception as e:
+            logger.error("Role cache refresh failed: %s", e)
+        finally:
+            self._refreshing.discard(entry["id"])
+
+    def stats(self) -> dict:
+        """Hit rates and lookup latency"""
+        lookups = self.hits_exact + self.hits_similar + self.misses
+        return {
+            "entries": len(self._entries or ()),
+            "hits_exact": self.hits_exact,
+            "hits_similar": self.hits_similar,
+            "misses": self.misses,
+            "hit_rate": round((self.hits_exact + self.hits_similar) / lookups, 3) if lookups else None,
+            "refreshes": self.refreshes,
+            "avg_lookup_ms": round(1000 * self.lookup_seconds / lookups, 3) if lookups else None
+        }
+
+
+# Shared cache used by the app
+role_cache = RoleCache()
@@ -2,22 +2,55 @@
 Dynamic Role Generator - Automatically generate discussion roles based on topic
 """
 import os
-from openai import OpenAI
+import json
+import logging
+from typing import AsyncIterator, List
 
-def generate_discussion_roles(topic: str, num_roles: int = 3):
-    """
-    Generate discussion roles based on topic
+from llm import get_backend, truncate_tokens
+from metrics import timed
 
-    Args:
-        topic: Discussion topic
-        num_roles: Number of roles to generate (default 3)
+logger = logging.getLogger(__name__)
 
-    Returns:
-        list: List of roles, each containing name and system_message
-    """
-    client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+# Longest topic passed to role generation, in tokens
+ROLE_CONTEXT_TOKENS = int(os.getenv("ROLE_CONTEXT_TOKENS", 200))
+
+# Generic roles used when generation fails (names already cleaned, meet API requirements)
+FALLBACK_ROLES = [
+    {
+        "name": "Supporter",
+        "display_name": "Supporter",
+        "system_message": """You support this topic and view it from a positive perspective. Keep it brief (2-3 sentences), show your stance.
+
+【IMPORTANT】SPEAK IN ENGLISH. Each reply MUST start with an emotion marker at the very beginning, such as: (excited), (happy), (confident), (delighted), etc.""",
+        "stance": "Supportive",
+        "personality": "Positive, optimistic"
+    },
+    {
+        "name": "Critic",
+        "display_name": "Critic",
+        "system_message": """You oppose this topic and view it from a critical perspective. Keep it brief (2-3 sentences), show your stance.
 
-    prompt = f"""You are an expert in generating discussion personas for debates.
+【IMPORTANT】SPEAK IN ENGLISH. Each reply MUST start with an emotion marker at the very beginning, such as: (angry), (frustrated), (sarcastic), (worried), etc.""",
+        "stance": "Critical",
+        "personality": "Critical, rational"
+    },
+    {
+        "name": "Mediator",
+        "display_name": "Mediator",
+        "system_message": """You remain neutral and objectively analyze both sides' viewpoints. Keep it brief (2-3 sentences), show your stance.
+
+【IMPORTANT】SPEAK IN ENGLISH. Each reply MUST start with an emotion marker at the very beginning, such as: (calm), (curious), (empathetic), etc.""",
+        "stance": "Neutral",
+        "personality": "Rational, objective"
+    }
+]
+
+
+def _roles_prompt(topic: str, num_roles: int) -> str:
+    """Role generation prompt, with the topic cut to ROLE_CONTEXT_TOKENS"""
+    topic = truncate_tokens(topic, ROLE_CONTEXT_TOKENS)
+
+    return f"""You are an expert in generating discussion personas for debates.
 
 The topic user wants to discuss is: "{topic}"
 
@@ -62,24 +95,13 @@ Topic: "Should we work overtime"
 
 Now generate roles for the topic "{topic}". Return only JSON, nothing else."""
 
-    try:
-        response = client.chat.completions.create(
-            model=os.getenv("OPENAI_MODEL", "gpt-4o-mini"),
-            messages=[{"role": "user", "content": prompt}],
-            temperature=0.8,
-            response_format={"type": "json_object"}
-        )
-
-        import json
-        roles_data = json.loads(response.choices[0].message.content)
 
-        # Convert to Agent format
-        agents_config = []
-        for role in roles_data.get("roles", []):
-            # Clean name: remove spaces and special characters, replace with underscores (OpenAI API requirement)
-            clean_name = role['name'].replace(' ', '_').replace('<', '').replace('>', '').replace('|', '').replace('/', '').replace('\\', '')
+def build_role(role: dict) -> dict:
+    """Agent config (cleaned name, system message) of one generated role"""
+    # Clean name: remove spaces and special characters, replace with underscores (OpenAI API requirement)
+    clean_name = role['name'].replace(' ', '_').replace('<', '').replace('>', '').replace('|', '').replace('/', '').replace('\\', '')
 
-            system_message = f"""You are {role['name']}.
+    system_message = f"""You are {role['name']}.
 
 Your stance: {role['stance']}
 
@@ -114,45 +136,118 @@ Example replies:
 
 Always add the most appropriate emotion marker at the start of each response."""
 
-            agents_config.append({
-                "name": clean_name,  # Use cleaned name
-                "display_name": role["name"],  # Keep original name for display
-                "system_message": system_message,
-                "stance": role["stance"],
-                "personality": role["personality"]
-            })
+    return {
+        "name": clean_name,  # Use cleaned name
+        "display_name": role["name"],  # Keep original name for display
+        "system_message": system_message,
+        "stance": role["stance"],
+        "personality": role["personality"]
+    }
+
+
+async def generate_discussion_roles(topic: str, num_roles: int = 3):
+    """
+    Generate discussion roles based on topic
+
+    Args:
+        topic: Discussion topic
+        num_roles: Number of roles to generate (default 3)
+
+    Returns:
+        list: List of roles, each containing name and system_message
+    """
+    try:
+        with timed("role_generation"):
+            response = await get_backend().complete(
+                messages=[{"role": "user", "content": _roles_prompt(topic, num_roles)}],
+                temperature=0.8,
+                response_format={"type": "json_object"}
+            )
 
-        return agents_config
+        roles_data = json.loads(response.text)
+
+        # Convert to Agent format
+        return [build_role(role) for role in roles_data.get("roles", [])]
 
     except Exception as e:
-        print(f"rolegeneratefailed: {e}")
-        # Fallback: return generic roles (names already cleaned, meet API requirements)
-        return [
-            {
-                "name": "Supporter",
-                "display_name": "Supporter",
-                "system_message": """You support this topic and view it from a positive perspective. Keep it brief (2-3 sentences), show your stance.
+        logger.error("Role generation failed: %s", e)
+        # Fallback: return generic roles
+        return [dict(role) for role in FALLBACK_ROLES]
 
-【IMPORTANT】SPEAK IN ENGLISH. Each reply MUST start with an emotion marker at the very beginning, such as: (excited), (happy), (confident), (delighted), etc.""",
-                "stance": "Supportive",
-                "personality": "Positive, optimistic"
-            },
-            {
-                "name": "Critic",
-                "display_name": "Critic",
-                "system_message": """You oppose this topic and view it from a critical perspective. Keep it brief (2-3 sentences), show your stance.
 
-【IMPORTANT】SPEAK IN ENGLISH. Each reply MUST start with an emotion marker at the very beginning, such as: (angry), (frustrated), (sarcastic), (worried), etc.""",
-                "stance": "Critical",
-                "personality": "Critical, rational"
-            },
-            {
-                "name": "Mediator",
-                "display_name": "Mediator",
-                "system_message": """You remain neutral and objectively analyze both sides' viewpoints. Keep it brief (2-3 sentences), show your stance.
+class RoleStreamParser:
+    """
+    Picks complete role objects out of a streamed {"roles": [...]} document
 
-【IMPORTANT】SPEAK IN ENGLISH. Each reply MUST start with an emotion marker at the very beginning, such as: (calm), (curious), (empathetic), etc.""",
-                "stance": "Neutral",
-                "personality": "Rational, objective"
-            }
-        ]
+    Tracks nesting depth and string state over the text fed so far; every
+    object that closes at role depth (inside the top-level array) is
+    decoded on its own, before the rest of the document has arrived.
+    """
+
+    ROLE_DEPTH = 3  # Top-level object, roles array, role object
+
+    def __init__(self):
+        self.text = ""
+        self._pos = 0
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+        self._start = None  # Offset of the role object being read
+
+    def feed(self, delta: str) -> List[dict]:
+        """Add streamed text, returning the role objects completed by it"""
+        self.text += delta
+        roles = []
+        for i in range(self._pos, len(self.text)):
+            char = self.text[i]
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == "\\":
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+            elif char == '"':
+                self._in_string = True
+            elif char in "{[":
+                self._depth += 1
+                if self._depth == self.ROLE_DEPTH and char == "{":
+                    self._start = i
+            elif char in "}]":
+                if self._depth == self.ROLE_DEPTH and self._start is not None:
+                    roles.append(json.loads(self.text[self._start:i + 1]))
+                    self._start = None
+                self._depth -= 1
+        self._pos = len(self.text)
+        return roles
+
+
+async def stream_discussion_roles(topic: str, num_roles: int = 3) -> AsyncIterator[dict]:
+    """
+    Generate discussion roles, yielding each as soon as its JSON object is complete
+
+    Same prompt and result as generate_discussion_roles. Falls back to the
+    generic roles if generation fails before any role was yielded.
+    """
+    parser = RoleStreamParser()
+    count = 0
+    with timed("role_generation"):
+        try:
+            async for delta in get_backend().stream(
+                messages=[{"role": "user", "content": _roles_prompt(topic, num_roles)}],
+                temperature=0.8,
+                response_format={"type": "json_object"}
+            ):
+                for role in parser.feed(delta):
+                    count += 1
+                    yield build_role(role)
+            if count == 0:
+                # Not the expected layout, decode the whole document
+                for role in json.loads(parser.text).get("roles", []):
+                    count += 1
+                    yield build_role(role)
+        except Exception as e:
+            logger.error("Streaming role generation failed after %d roles: %s", count, e)
+            if count == 0:
+                for role in FALLBACK_ROLES:
+                    yield dict(role)
@@ -0,0 +1,114 @@
+"""
+Session Store - Bounded in-memory store of live discussion sessions
+"""
+import os
+import time
+import logging
+from collections import OrderedDict
+from typing import Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+# Live sessions kept in memory; least recently used ones are dropped beyond this
+SESSION_CAPACITY = int(os.getenv("SESSION_CAPACITY", 1000))
+# Sessions unused for this long are dropped (0 keeps them until capacity is reached)
+SESSION_IDLE_MINUTES = float(os.getenv("SESSION_IDLE_MINUTES", 60))
+
+
+class SessionStore:
+    """
+    Discussion sessions by discussion id, with LRU and idle eviction
+
+    Dropped sessions are not lost: the discussion rows hold enough to
+    rebuild them (see main.get_session). A session whose turn lock is
+    held is never evicted, so an in-flight turn cannot race a rebuilt copy
+    of its session.
+    """
+
+    def __init__(
+        self,
+        capacity: int = SESSION_CAPACITY,
+        idle_minutes: float = SESSION_IDLE_MINUTES,
+        on_evict: Optional[Callable[[dict], None]] = None
+    ):
+        self.capacity = capacity
+        self.idle_seconds = idle_minutes * 60
+        self.on_evict = on_evict
+        self._sessions = OrderedDict()  # discussion id -> session, least recently used first
+        self.evicted_lru = 0
+        self.evicted_idle = 0
+        self.restored = 0
+
+    def __len__(self):
+        return len(self._sessions)
+
+    def __contains__(self, discussion_id: int):
+        return discussion_id in self._sessions
+
+    def get(self, discussion_id: int) -> Optional[dict]:
+        """Session of a discussion, marked as just used; None if not in memory"""
+        session = self._sessions.get(discussion_id)
+        if session is not None:
+            session["last_used"] = time.monotonic()
+            self._sessions.move_to_end(discussion_id)
+        return session
+
+    def put(self, discussion_id: int, session: dict):
+        """Add or replace a session, evicting others beyond capacity"""
+        previous = self._sessions.pop(discussion_id, None)
+        if previous is not None and previous is not session:
+            self._drop(previous)
+        session["last_used"] = time.monotonic()
+        self._sessions[discussion_id] = session
+        self._evict_over_capacity()
+
+    def pop(self, discussion_id: int) -> Optional[dict]:
+        """Remove a session, e.g. of a finished discussion"""
+        return self._sessions.pop(discussion_id, None)
+
+    def _drop(self, session: dict):
+        if self.on_evict:
+            self.on_evict(session)
+
+    @staticmethod
+    def _busy(session: dict) -> bool:
+        return session["turn_lock"].locked()
+
+    def _evict_over_capacity(self):
+        excess = len(self._sessions) - self.capacity
+        if excess <= 0:
+            return
+        for discussion_id in [i for i, s in self._sessions.items() if not self._busy(s)][:excess]:
+            self._drop(self._sessions.pop(discussion_id))
+            self.evicted_lru += 1
+            logger.debug("Evicted session of discussion %d (capacity)", discussion_id)
+
+    def evict_idle(self) -> int:
+        """Drop sessions unused for longer than the idle timeout, returning how many"""
+        if not self.idle_seconds:
+            return 0
+        deadline = time.monotonic() - self.idle_seconds
+        idle = [
+            discussion_id for discussion_id, session in self._sessions.items()
+            if session["last_used"] < deadline and not self._busy(session)
+        ]
+        for discussion_id in idle:
+            self._drop(self._sessions.pop(discussion_id))
+        self.evicted_idle += len(idle)
+        return len(idle)
+
+    def memory_bytes(self) -> int:
+        """Approximate size of the texts held by all sessions"""
+        return sum(session["agent_system"].memory_bytes() for session in self._sessions.values())
+
+    def stats(self) -> dict:
+        """Occupancy, evictions and memory"""
+        return {
+            "sessions": len(self._sessions),
+            "capacity": self.capacity,
+            "idle_minutes": self.idle_seconds / 60,
+            "evicted_lru": self.evicted_lru,
+            "evicted_idle": self.evicted_idle,
+            "restored": self.restored,
+            "memory_bytes": self.memory_bytes()
+        }
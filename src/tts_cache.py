@@ -0,0 +1,141 @@
+"""
+TTS Audio Cache - Content-addressed on-disk cache with LRU eviction
+"""
+import os
+import json
+import hashlib
+import pathlib
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+
+def normalize_text(text: str) -> str:
+    """Normalize text so trivially different inputs share a cache entry"""
+    return " ".join(text.split())
+
+
+class TTSCache:
+    """
+    Audio cache keyed by hash of (voice_id, normalized text, synthesis settings)
+
+    Entries are stored as files under the cache directory. When the total
+    size exceeds max_bytes, least recently used entries are evicted. Recency
+    survives restarts through file modification times.
+    """
+
+    def __init__(self, directory: str, max_bytes: int):
+        """
+        Args:
+            directory: Cache directory, created if missing
+            max_bytes: Size limit of all cached audio, 0 disables the cache
+        """
+        self.directory = pathlib.Path(directory)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()  # key -> size, least recently used first
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+
+        if self.enabled:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            self._load()
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0
+
+    @staticmethod
+    def make_key(voice_id: str, text: str, settings: dict) -> str:
+        """Build cache key for a synthesis request"""
+        payload = json.dumps([voice_id, normalize_text(text), settings], sort_keys=True)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> pathlib.Path:
+        return self.directory / key[:2] / f"{key}.mp3"
+
+    def _load(self):
+        """Index existing entries, oldest first"""
+        files = []
+        for path in self.directory.glob("*/*.mp3"):
+            stat = path.stat()
+            files.append((stat.st_mtime, path.stem, stat.st_size))
+        for _, key, size in sorted(files):
+            self._entries[key] = size
+            self._total_bytes += size
+        self._evict()
+
+    def get(self, key: str) -> Optional[bytes]:
+        """Return cached audio or None, counting hit or miss"""
+        if not self.enabled:
+            return None
+
+        with self._lock:
+            if key not in self._entries:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+
+        path = self._path(key)
+        try:
+            data = path.read_bytes()
+            os.utime(path)  # Persist recency for the next start
+        except OSError:
+            with self._lock:
+                size = self._entries.pop(key, None)
+                if size is not None:
+                    self._total_bytes -= size
+                self.misses += 1
+            return None
+
+        with self._lock:
+            self.hits += 1
+        return data
+
+    def put(self, key: str, data: bytes):
+        """Store audio, evicting least recently used entries if over the limit"""
+        if not self.enabled or len(data) > self.max_bytes:
+            return
+
+        path = self._path(key)
+        path.parent.mkdir(exist_ok=True)
+        # Write to a temporary file first so readers never see partial audio
+        tmp_path = path.with_suffix(f".{threading.get_ident()}.tmp")
+        tmp_path.write_bytes(data)
+        os.replace(tmp_path, path)
+
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._total_bytes -= previous
+            self._entries[key] = len(data)
+            self._total_bytes += len(data)
+            self._evict()
+
+    def _evict(self):
+        """Drop least recently used entries until under the limit (lock held)"""
+        while self._total_bytes > self.max_bytes and self._entries:
+            key, size = self._entries.popitem(last=False)
+            self._total_bytes -= size
+            self.evictions += 1
+            try:
+                self._path(key).unlink()
+            except OSError:
+                pass
+
+    def stats(self) -> dict:
+        """Cache counters for monitoring"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "enabled": self.enabled,
+                "entries": len(self._entries),
+                "bytes": self._total_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0
+            }
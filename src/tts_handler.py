@@ -1,11 +1,51 @@
 """
-Fish Audio TTS Handler - HTTP API One-time Generation
+Fish Audio TTS Handler - HTTP API generation, whole reply or pipelined sentence chunks
 """
 import os
+import re
+import random
+import asyncio
 import httpx
+import logging
 import msgpack
-import base64
-from typing import Optional
+from typing import AsyncIterator, Iterable, List, Optional, Tuple, Union
+
+from tts_cache import TTSCache
+from workers import worker_pool
+from metrics import timed
+
+logger = logging.getLogger(__name__)
+
+# Synthesis settings sent with every request, also part of the audio cache key
+TTS_MODEL = "s1"  # S1 model supports emotion tags like (happy), (sad), etc.
+TTS_SETTINGS = {
+    "format": "mp3",
+    "mp3_bitrate": 128,
+    "normalize": True,
+    "latency": "balanced"  # Balanced mode, faster
+}
+
+# Fish Audio connection settings
+FISH_AUDIO_BASE_URL = os.getenv("FISH_AUDIO_BASE_URL", "https://api.fish.audio")
+FISH_AUDIO_MAX_CONCURRENCY = int(os.getenv("FISH_AUDIO_MAX_CONCURRENCY", 8))
+FISH_AUDIO_MAX_RETRIES = int(os.getenv("FISH_AUDIO_MAX_RETRIES", 3))
+FISH_AUDIO_RETRY_RATIO = float(os.getenv("FISH_AUDIO_RETRY_RATIO", 0.2))
+FISH_AUDIO_HTTP2 = os.getenv("FISH_AUDIO_HTTP2", "0") == "1"
+
+# Generated audio cache, shared by agent turns and user messages
+tts_cache = TTSCache(
+    os.getenv("TTS_CACHE_DIR", "./tts_cache"),
+    int(os.getenv("TTS_CACHE_MAX_MB", 512)) * 1024 * 1024
+)
+
+# Maximum number of sentence chunks synthesized at the same time
+TTS_CHUNK_CONCURRENCY = int(os.getenv("TTS_CHUNK_CONCURRENCY", 3))
+
+# Leading emotion marker, e.g. "(excited) "
+EMOTION_MARKER = re.compile(r"^\s*(\([^()]{1,30}\))\s*")
+
+# Sentence end: terminal punctuation (optionally followed by closing quotes) and whitespace
+SENTENCE_END = re.compile(r"(?<=[.!?…])[\"')\]]*\s+")
 
 # Fish Audio available voice profiles (selected based on character traits)
 # Real voice IDs from documentation - All support S1 emotion control
@@ -18,6 +58,146 @@ VOICE_PROFILES = {
     "neutral": "802e3bc2b27e49c2995d23ef70e6ac89",  # Energetic Male (temp for testing)
 }
 
+class RetryBudget:
+    """
+    Limit retries to a fraction of requests
+
+    Every request deposits `ratio` tokens (capped), every retry spends one.
+    When Fish Audio is down this stops retries from multiplying the load.
+    """
+
+    def __init__(self, ratio: float, min_tokens: float = 10.0):
+        self.ratio = ratio
+        self.max_tokens = min_tokens
+        self.tokens = min_tokens
+
+    def deposit(self):
+        self.tokens = min(self.max_tokens, self.tokens + self.ratio)
+
+    def withdraw(self) -> bool:
+        if self.tokens < 1:
+            return False
+        self.tokens -= 1
+        return True
+
+
+class FishAudioClient:
+    """
+    Application-scoped Fish Audio client
+
+    One pooled httpx client (keep-alive, optional HTTP/2) shared by all
+    requests, a limit on concurrent requests, and jittered exponential
+    backoff for 429 and 5xx responses within a retry budget.
+    """
+
+    def __init__(
+        self,
+        base_url: str = FISH_AUDIO_BASE_URL,
+        max_concurrency: int = FISH_AUDIO_MAX_CONCURRENCY,
+        max_retries: int = FISH_AUDIO_MAX_RETRIES,
+        retry_ratio: float = FISH_AUDIO_RETRY_RATIO,
+        http2: bool = FISH_AUDIO_HTTP2,
+        timeout: float = 30.0,
+        backoff_base: float = 0.25,
+        backoff_max: float = 8.0
+    ):
+        self.base_url = base_url
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.http2 = http2
+        self.timeout = timeout
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.retry_budget = RetryBudget(retry_ratio)
+        self.retries = 0
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._client = None
+        self._sdk_client = None
+
+    async def start(self):
+        """Open the connection pool (called on app startup)"""
+        if self._client is not None:
+            return
+
+        http2 = self.http2
+        if http2:
+            try:
+                import h2  # noqa: F401 - httpx needs it for HTTP/2
+            except ImportError:
+                logger.warning("FISH_AUDIO_HTTP2 set but h2 is not installed, using HTTP/1.1")
+                http2 = False
+
+        self._client = httpx.AsyncClient(
+            base_url=self.base_url,
+            timeout=self.timeout,
+            http2=http2,
+            limits=httpx.Limits(
+                max_connections=self.max_concurrency,
+                max_keepalive_connections=self.max_concurrency,
+                keepalive_expiry=60.0
+            )
+        )
+
+    async def close(self):
+        """Close the connection pool (called on app shutdown)"""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def _backoff(self, attempt: int, response: Optional[httpx.Response]) -> float:
+        """Full-jitter exponential backoff, honoring Retry-After when given"""
+        if response is not None:
+            retry_after = response.headers.get("Retry-After", "")
+            if retry_after.isdigit():
+                return min(float(retry_after), self.backoff_max)
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    async def post(self, path: str, **kwargs) -> httpx.Response:
+        """
+        POST to Fish Audio, retrying 429/5xx responses and connection errors
+
+        Returns:
+            httpx.Response: Last response received
+        """
+        if self._client is None:
+            await self.start()
+
+        self.retry_budget.deposit()
+        attempt = 0
+        while True:
+            response = None
+            error = None
+            async with self._semaphore:
+                try:
+                    response = await self._client.post(path, **kwargs)
+                except httpx.TransportError as e:
+                    error = e
+
+            retryable = error is not None or response.status_code == 429 or response.status_code >= 500
+            if not retryable or attempt >= self.max_retries or not self.retry_budget.withdraw():
+                if error is not None:
+                    raise error
+                return response
+
+            delay = self._backoff(attempt, response)
+            reason = error or response.status_code
+            logger.info("Fish Audio request failed (%s), retry %d in %.2fs", reason, attempt + 1, delay)
+            self.retries += 1
+            attempt += 1
+            await asyncio.sleep(delay)
+
+    def sdk(self, api_key: str):
+        """Shared Fish Audio SDK client"""
+        if self._sdk_client is None:
+            from fishaudio import FishAudio
+            self._sdk_client = FishAudio(api_key=api_key)
+        return self._sdk_client
+
+
+# Shared client, opened and closed with the app
+fish_audio = FishAudioClient()
+
+
 def select_voice_for_role(role_name: str, personality: str) -> str:
     """
     Select appropriate voice based on role name and personality
@@ -45,66 +225,208 @@ def select_voice_for_role(role_name: str, personality: str) -> str:
     else:
         # Random assignment by default
         voices = list(VOICE_PROFILES.values())
-        import random
         return random.choice(voices)
 
 
-async def generate_tts(text: str, voice_id: str) -> Optional[str]:
+async def synthesize_speech(text: str, voice_id: str) -> Optional[bytes]:
     """
-    Generate speech using Fish Audio HTTP API
+    Generate speech using Fish Audio HTTP API, checking the audio cache first
 
     Args:
         text: Text to synthesize
         voice_id: Voice ID
 
     Returns:
-        str: base64-encoded complete MP3 audio, None if failed
+        bytes: Complete MP3 audio, None if failed
     """
     api_key = os.getenv("FISH_AUDIO_API_KEY")
     if not api_key:
-        print("⚠️ FISH_AUDIO_API_KEY not found, skipping TTS")
+        logger.warning("FISH_AUDIO_API_KEY not found, skipping TTS")
         return None
 
-    print(f"🎤 Starting TTS synthesis (voice: {voice_id}): {text[:80]}...")
-    print(f"   📝 Full text for TTS: {repr(text)}")
+    cache_key = TTSCache.make_key(voice_id, text, {"model": TTS_MODEL, **TTS_SETTINGS})
+    cached = await worker_pool.run(tts_cache.get, cache_key)
+    if cached is not None:
+        logger.debug("TTS cache hit: voice=%s chars=%d", voice_id, len(text))
+        return cached
+
+    logger.debug("TTS synthesis: voice=%s chars=%d", voice_id, len(text))
 
     try:
         # Prepare request data
         request_data = {
             "text": text,
             "reference_id": voice_id,
-            "format": "mp3",
-            "mp3_bitrate": 128,
-            "normalize": True,
-            "latency": "balanced"  # Balanced mode, faster
+            **TTS_SETTINGS
         }
 
+        with timed("payload_encoding"):
+            payload = msgpack.packb(request_data)
+
         # Send request - Use S1 model for emotion control support
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            response = await client.post(
-                "https://api.fish.audio/v1/tts",
-                content=msgpack.packb(request_data),
+        with timed("tts_request"):
+            response = await fish_audio.post(
+                "/v1/tts",
+                content=payload,
                 headers={
                     "Authorization": f"Bearer {api_key}",
                     "Content-Type": "application/msgpack",
-                    "model": "s1"  # S1 model supports emotion tags like (happy), (sad), etc.
+                    "model": TTS_MODEL
                 }
             )
 
-            if response.status_code == 200:
-                # Convert to base64
-                audio_base64 = base64.b64encode(response.content).decode('utf-8')
-                print(f"✅ TTS generated successfully (size: {len(response.content)} bytes)")
-                return audio_base64
-            else:
-                print(f"❌ TTS generation failed: {response.status_code} - {response.text}")
-                return None
+        if response.status_code == 200:
+            logger.debug("TTS generated: %d bytes", len(response.content))
+            await worker_pool.run(tts_cache.put, cache_key, response.content)
+            return response.content
+        else:
+            logger.error("TTS generation failed: %s - %s", response.status_code, response.text[:200])
+            return None
 
     except Exception as e:
-        print(f"❌ TTS error: {e}")
+        logger.error("TTS error: %s", e)
         return None
 
 
+# One silent MPEG-1 Layer III frame: 128 kbps, 44.1 kHz, mono, zeroed side info and
+# main data, which decoders play as 1152 samples of silence
+SILENT_MP3_FRAME = bytes([0xFF, 0xFB, 0x90, 0xC0]) + bytes(413)
+SILENT_MP3_FRAME_MS = 1152 / 44100 * 1000
+
+
+def mp3_silence(duration_ms: int) -> bytes:
+    """MP3 data that plays as silence for about duration_ms, can be concatenated with other MP3"""
+    frames = round(duration_ms / SILENT_MP3_FRAME_MS)
+    return SILENT_MP3_FRAME * frames
+
+
+def split_sentences(text: str) -> List[str]:
+    """
+    Split reply into sentences for chunked synthesis
+
+    The leading emotion marker is attached to every chunk so each one keeps
+    the intended emotion when synthesized on its own.
+
+    Args:
+        text: Reply text, optionally starting with an "(emotion)" marker
+
+    Returns:
+        list: Sentence chunks
+    """
+    splitter = SentenceSplitter()
+    return splitter.feed(text) + splitter.flush()
+
+
+class SentenceSplitter:
+    """Incrementally split streamed text into complete sentences"""
+
+    def __init__(self):
+        self.buffer = ""
+        self.marker = None  # None until the start of the reply has been seen
+
+    def feed(self, delta: str) -> List[str]:
+        """Add streamed text, return sentences completed by it"""
+        self.buffer += delta
+
+        if self.marker is None:
+            stripped = self.buffer.lstrip()
+            # Wait until we can tell whether the reply starts with a marker
+            if not stripped or (stripped.startswith("(") and ")" not in stripped):
+                return []
+            match = EMOTION_MARKER.match(self.buffer)
+            if match:
+                self.marker = match.group(1)
+                self.buffer = self.buffer[match.end():]
+            else:
+                self.marker = ""
+
+        sentences = []
+        while True:
+            match = SENTENCE_END.search(self.buffer)
+            if not match:
+                break
+            # Keep punctuation and closing quotes with the sentence
+            sentence = self.buffer[:match.end()].strip()
+            self.buffer = self.buffer[match.end():]
+            if sentence:
+                sentences.append(self._with_marker(sentence))
+        return sentences
+
+    def flush(self) -> List[str]:
+        """Return whatever is left once the stream has ended"""
+        rest = self.buffer.strip()
+        self.buffer = ""
+        if self.marker is None:
+            match = EMOTION_MARKER.match(rest)
+            self.marker = match.group(1) if match else ""
+            rest = rest[match.end():] if match else rest
+        return [self._with_marker(rest)] if rest else []
+
+    def _with_marker(self, sentence: str) -> str:
+        return f"{self.marker} {sentence}" if self.marker else sentence
+
+
+async def generate_tts_chunks(
+    sentences: Union[Iterable[str], AsyncIterator[str]],
+    voice_id: str,
+    max_concurrency: Optional[int] = None
+) -> AsyncIterator[Tuple[int, str, Optional[bytes]]]:
+    """
+    Synthesize sentence chunks concurrently, yielding them in order
+
+    Synthesis of a chunk starts as soon as it arrives, so when sentences come
+    from a streaming reply, audio for sentence 1 is produced while sentence 2
+    is still being generated. At most max_concurrency requests run at once.
+
+    Args:
+        sentences: Sentence chunks, sync or async iterable
+        voice_id: Voice ID
+        max_concurrency: Maximum parallel TTS requests (default TTS_CHUNK_CONCURRENCY)
+
+    Yields:
+        (index, sentence, audio) in sentence order, audio bytes None if failed
+    """
+    semaphore = asyncio.Semaphore(max_concurrency or TTS_CHUNK_CONCURRENCY)
+    pending = asyncio.Queue()
+
+    async def synthesize(sentence):
+        async with semaphore:
+            return await synthesize_speech(sentence, voice_id)
+
+    async def schedule():
+        try:
+            if hasattr(sentences, "__aiter__"):
+                async for sentence in sentences:
+                    await pending.put((sentence, asyncio.create_task(synthesize(sentence))))
+            else:
+                for sentence in sentences:
+                    await pending.put((sentence, asyncio.create_task(synthesize(sentence))))
+        finally:
+            await pending.put(None)
+
+    scheduler = asyncio.create_task(schedule())
+    tasks = []
+    try:
+        index = 0
+        while True:
+            item = await pending.get()
+            if item is None:
+                break
+            sentence, task = item
+            tasks.append(task)
+            yield index, sentence, await task
+            index += 1
+        await scheduler
+    finally:
+        scheduler.cancel()
+        while not pending.empty():
+            item = pending.get_nowait()
+            if item is not None:
+                tasks.append(item[1])
+        for task in tasks:
+            task.cancel()
+
+
 async def create_voice_clone(name: str, audio_data: bytes, description: str = "") -> Optional[str]:
     """
     Create voice clone using Fish Audio Python SDK
@@ -121,18 +443,15 @@ async def create_voice_clone(name: str, audio_data: bytes, description: str = ""
     """
     api_key = os.getenv("FISH_AUDIO_API_KEY")
     if not api_key:
-        print("⚠️ FISH_AUDIO_API_KEY not found, cannot clone voice")
+        logger.warning("FISH_AUDIO_API_KEY not found, cannot clone voice")
         return None
 
-    print(f"🎙️ Starting voice clone creation: {name}")
+    logger.info("Creating voice clone: %s", name)
 
     try:
-        from fishaudio import FishAudio
-        import asyncio
-
         # Create voice using Fish Audio Python SDK
         def create_voice_sync():
-            client = FishAudio(api_key=api_key)
+            client = fish_audio.sdk(api_key)
 
             # Create voice model
             voice = client.voices.create(
@@ -144,15 +463,12 @@ async def create_voice_clone(name: str, audio_data: bytes, description: str = ""
 
             return voice.id
 
-        # Run sync function in thread pool
-        loop = asyncio.get_event_loop()
-        voice_id = await loop.run_in_executor(None, create_voice_sync)
+        # Run sync function in the shared worker pool
+        voice_id = await worker_pool.run(create_voice_sync)
 
-        print(f"✅ Voice clone created successfully! Voice ID: {voice_id}")
+        logger.info("Voice clone created: %s", voice_id)
         return voice_id
 
-    except Exception as e:
-        print(f"❌ Voice clone error: {e}")
-        import traceback
-        traceback.print_exc()
+    except Exception:
+        logger.exception("Voice clone error")
         return None
@@ -0,0 +1,93 @@
+"""
+Worker Pool - Shared bounded thread pool for blocking work
+"""
+import os
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable
+
+# Number of threads for blocking calls (audio file I/O, Fish Audio SDK); LLM calls are async
+WORKER_POOL_SIZE = int(os.getenv("WORKER_POOL_SIZE", 16))
+
+
+class WorkerPool:
+    """
+    Application-wide thread pool with queue depth and activity counters
+
+    Started and stopped with the app. Calls made before start() (scripts,
+    tests) start it lazily.
+    """
+
+    def __init__(self, max_workers: int = WORKER_POOL_SIZE, name: str = "worker"):
+        self.max_workers = max_workers
+        self.name = name
+        self.queued = 0  # Submitted, waiting for a free thread
+        self.active = 0  # Running on a thread
+        self.completed = 0
+        self.failed = 0
+        self.cancelled = 0  # Dropped before a thread picked them up
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.max_workers,
+                thread_name_prefix=self.name
+            )
+
+    def shutdown(self, wait: bool = True):
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait, cancel_futures=True)
+            self._executor = None
+
+    async def run(self, fn: Callable, *args):
+        """Run fn(*args) on the pool and await its result"""
+        self.start()
+        with self._lock:
+            self.queued += 1
+
+        def call():
+            with self._lock:
+                self.queued -= 1
+                self.active += 1
+            try:
+                result = fn(*args)
+            except BaseException:
+                with self._lock:
+                    self.active -= 1
+                    self.failed += 1
+                raise
+            with self._lock:
+                self.active -= 1
+                self.completed += 1
+            return result
+
+        def done(future):
+            # Cancelled while queued (the awaiting task was cancelled, or the
+            # pool shut down): call never ran, so it is still counted as queued
+            if future.cancelled():
+                with self._lock:
+                    self.queued -= 1
+                    self.cancelled += 1
+
+        future = self._executor.submit(call)
+        future.add_done_callback(done)
+        return await asyncio.wrap_future(future)
+
+    def stats(self) -> dict:
+        """Pool counters for sizing"""
+        with self._lock:
+            return {
+                "max_workers": self.max_workers,
+                "active": self.active,
+                "queued": self.queued,
+                "completed": self.completed,
+                "failed": self.failed,
+                "cancelled": self.cancelled
+            }
+
+
+# Shared pool, started and stopped with the app
+worker_pool = WorkerPool()
@@ -6,6 +6,7 @@ document.addEventListener('DOMContentLoaded', () => {
     const autoPlayBtn = document.getElementById('auto-play-btn');
     const toggleInputBtn = document.getElementById('toggle-input-btn');
     const modeToggleBtn = document.getElementById('mode-toggle-btn');
+    const exportBtn = document.getElementById('export-btn');
     const userInputArea = document.getElementById('user-input-area');
     const userMessageInput = document.getElementById('user-message-input');
     const sendUserMessageBtn = document.getElementById('send-user-message-btn');
@@ -33,6 +34,9 @@ document.addEventListener('DOMContentLoaded', () => {
     let availableVoices = [];  // Available voices list
     let selectedUserVoice = null;  // User selected voice
     let userClonedVoices = [];  // User cloned voices list
+    let discussionSocket = null;  // WebSocket streaming turns of the current discussion
+    let turnHandler = null;  // Handles socket events for the turn currently streaming
+    let currentChunkPlayer = null;  // Plays sentence audio chunks of the streaming turn
 
     // Initialize AudioContext
     if (window.AudioContext || window.webkitAudioContext) {
@@ -176,6 +180,12 @@ document.addEventListener('DOMContentLoaded', () => {
         }
     });
 
+    // Export discussion as podcast MP3 (streamed by the server, saved by the browser)
+    exportBtn.addEventListener('click', () => {
+        if (!currentDiscussionId) return;
+        window.location.href = `/discussions/${currentDiscussionId}/export.mp3`;
+    });
+
     // Send User Message
     async function sendUserMessage() {
         const message = userMessageInput.value.trim();
@@ -211,9 +221,9 @@ document.addEventListener('DOMContentLoaded', () => {
             const data = await response.json();
 
             // Play user's TTS audio if available
-            if (data.audio && audioContext) {
+            if (data.audio_url && audioContext) {
                 nextTurnBtn.textContent = "Skip";
-                await playAudioFromBase64(data.audio, 'You');
+                await playAudioFromUrl(data.audio_url, 'You');
                 nextTurnBtn.textContent = "Next Turn";
             }
 
@@ -260,27 +270,42 @@ document.addEventListener('DOMContentLoaded', () => {
             const discussion = await createRes.json();
             currentDiscussionId = discussion.id;
 
-            // Initialize discussion (generate roles)
-            const initRes = await fetch(`/discussions/${discussion.id}/init`, {
-                method: 'POST'
-            });
-            const data = await initRes.json();
+            // Initialize discussion, showing each generated role as it arrives
+            let panelShown = false;
+            const showDebatePanel = () => {
+                if (panelShown) return;
+                panelShown = true;
 
-            // Switch panels
-            setupPanel.classList.remove('active');
-            setupPanel.classList.add('hidden');
+                // Switch panels
+                setupPanel.classList.remove('active');
+                setupPanel.classList.add('hidden');
 
-            // Wait for animation
-            setTimeout(() => {
-                setupPanel.style.display = 'none';
-                debatePanel.classList.remove('hidden');
-                debatePanel.classList.add('active');
-            }, 300);
+                // Wait for animation
+                setTimeout(() => {
+                    setupPanel.style.display = 'none';
+                    debatePanel.classList.remove('hidden');
+                    debatePanel.classList.add('active');
+                }, 300);
 
-            currentTopicText.textContent = topic;
+                currentTopicText.textContent = topic;
+                displayAgents([]);
+            };
+
+            const initRes = await fetch(`/discussions/${discussion.id}/init?stream=true`, {
+                method: 'POST'
+            });
+            await readServerEvents(initRes, (event, data) => {
+                if (event === 'role') {
+                    showDebatePanel();
+                    addAgentBadge(data);
+                } else if (event === 'error') {
+                    throw new Error(data.detail);
+                }
+            });
+            showDebatePanel();
 
-            // Display generated agents
-            displayAgents(data.roles);
+            // Open streaming channel for turns
+            connectDiscussionSocket(discussion.id);
 
             // Ready for first turn
             startBtn.textContent = "Start Simulation";
@@ -315,6 +340,10 @@ document.addEventListener('DOMContentLoaded', () => {
 
     function stopCurrentAudio() {
         if (currentAudio) {
+            // Skipping drops the remaining sentences of a chunked reply too
+            if (currentChunkPlayer) {
+                currentChunkPlayer.cancel();
+            }
             try {
                 currentAudio.stop();
                 currentAudio = null;
@@ -327,6 +356,148 @@ document.addEventListener('DOMContentLoaded', () => {
         }
     }
 
+    function connectDiscussionSocket(discussionId) {
+        if (discussionSocket) {
+            discussionSocket.close();
+        }
+
+        const protocol = window.location.protocol === 'https:' ? 'wss:' : 'ws:';
+        const socket = new WebSocket(`${protocol}//${window.location.host}/ws/discussions/${discussionId}`);
+        socket.binaryType = 'arraybuffer';
+
+        socket.onmessage = (event) => {
+            // Binary frames are sentence audio chunks: 4-byte index + MP3 bytes
+            const data = event.data instanceof ArrayBuffer
+                ? { type: 'audio_chunk', audio: event.data.slice(4) }
+                : JSON.parse(event.data);
+            if (turnHandler) {
+                turnHandler(data);
+            }
+        };
+
+        socket.onclose = () => {
+            if (discussionSocket === socket) {
+                discussionSocket = null;
+            }
+            // Unblock a turn that was waiting on this socket
+            if (turnHandler) {
+                turnHandler({ type: 'error', detail: 'Connection closed' });
+            }
+        };
+
+        discussionSocket = socket;
+    }
+
+    // Stream next turn over the socket, showing the reply as it is generated.
+    // Resolves with the same shape as the /next_turn response.
+    function streamNextTurn() {
+        return new Promise((resolve, reject) => {
+            const result = { status: 'ongoing', agent: null, content: '', audio_url: null, playback: null };
+            let textNode = null;
+            let chunkPlayer = null;
+
+            turnHandler = (data) => {
+                if (data.type === 'speaker') {
+                    result.agent = data.agent;
+                    textNode = addMessageToChat(data.agent, '');
+                    statusIndicator.textContent = `${data.agent} is speaking...`;
+                } else if (data.type === 'token') {
+                    result.content += data.delta;
+                    if (textNode) {
+                        textNode.textContent = result.content;
+                        chatContainer.scrollTop = chatContainer.scrollHeight;
+                    }
+                } else if (data.type === 'audio') {
+                    result.audio_url = data.audio_url;
+                } else if (data.type === 'audio_chunk') {
+                    // Start playing the first sentence while the rest is synthesized
+                    if (!chunkPlayer) {
+                        chunkPlayer = createChunkPlayer(result.agent);
+                        result.playback = chunkPlayer.finished;
+                    }
+                    chunkPlayer.push(data.audio);
+                } else if (data.type === 'done') {
+                    turnHandler = null;
+                    // Stored audio of the whole reply; sentence mode sends no 'audio' event, so
+                    // without chunks (all failed or none sent) this is what gets played
+                    result.audio_url = data.audio_url;
+                    if (chunkPlayer) {
+                        chunkPlayer.close();
+                    }
+                    resolve(result);
+                } else if (data.type === 'finished') {
+                    turnHandler = null;
+                    resolve({ status: 'finished' });
+                } else if (data.type === 'error') {
+                    turnHandler = null;
+                    reject(new Error(data.detail));
+                }
+            };
+
+            discussionSocket.send(JSON.stringify({ action: 'next_turn', tts: 'sentences' }));
+        });
+    }
+
+    // Queue of sentence audio chunks played back to back in arrival order
+    function createChunkPlayer(agentName) {
+        const pending = [];
+        let waiting = null;
+        let closed = false;
+        let cancelled = false;
+
+        const nextChunk = () => new Promise((resolve) => {
+            if (pending.length > 0 || closed) {
+                resolve(pending.shift());
+            } else {
+                waiting = resolve;
+            }
+        });
+
+        const wake = (chunk) => {
+            const resolve = waiting;
+            waiting = null;
+            resolve(chunk);
+        };
+
+        const player = {
+            push(chunk) {
+                if (cancelled) return;
+                if (waiting) {
+                    wake(chunk);
+                } else {
+                    pending.push(chunk);
+                }
+            },
+            close() {
+                closed = true;
+                if (waiting) {
+                    wake(undefined);
+                }
+            },
+            cancel() {
+                cancelled = true;
+                pending.length = 0;
+                player.close();
+            }
+        };
+
+        currentChunkPlayer = player;
+        player.finished = (async () => {
+            let chunk;
+            while ((chunk = await nextChunk()) !== undefined) {
+                if (cancelled) break;
+                if (chunk) {
+                    await playAudioData(chunk, agentName);
+                }
+            }
+            if (currentChunkPlayer === player) {
+                currentChunkPlayer = null;
+            }
+        })();
+
+        return player;
+    }
+
     async function triggerNextTurn() {
         if (isProcessing || !currentDiscussionId) return;
         isProcessing = true;
@@ -334,10 +505,17 @@ document.addEventListener('DOMContentLoaded', () => {
         statusIndicator.textContent = "Agent is thinking...";
 
         try {
-            const response = await fetch(`/discussions/${currentDiscussionId}/next_turn`, {
-                method: 'POST'
-            });
-            const data = await response.json();
+            // Prefer streaming over the socket, fall back to a single request
+            const streamed = discussionSocket && discussionSocket.readyState === WebSocket.OPEN;
+            let data;
+            if (streamed) {
+                data = await streamNextTurn();
+            } else {
+                const response = await fetch(`/discussions/${currentDiscussionId}/next_turn`, {
+                    method: 'POST'
+                });
+                data = await response.json();
+            }
 
             if (data.status === 'finished') {
                 statusIndicator.textContent = "Debate finished.";
@@ -347,14 +525,18 @@ document.addEventListener('DOMContentLoaded', () => {
                 return;
             }
 
-            // Add message to UI
-            addMessageToChat(data.agent, data.content);
+            // Add message to UI (streamed turns are already displayed)
+            if (!streamed) {
+                addMessageToChat(data.agent, data.content);
+            }
 
-            // Play audio
-            if (data.audio && audioContext) {
+            // Play audio (sentence chunks may already be playing)
+            const playback = data.playback
+                || (data.audio_url && audioContext ? playAudioFromUrl(data.audio_url, data.agent) : null);
+            if (playback) {
                 statusIndicator.textContent = "Speaking...";
                 nextTurnBtn.textContent = "Skip";  // Change button text during playback
-                await playAudioFromBase64(data.audio, data.agent);
+                await playback;
                 isProcessing = false;
                 nextTurnBtn.textContent = "Next Turn";
                 currentAudio = null;
@@ -392,8 +574,21 @@ document.addEventListener('DOMContentLoaded', () => {
         }
     }
 
-    async function playAudioFromBase64(audioBase64, agentName) {
-        if (!audioBase64 || !audioContext) {
+    async function playAudioFromUrl(audioUrl, agentName) {
+        if (!audioUrl || !audioContext) {
+            return;
+        }
+
+        try {
+            const response = await fetch(audioUrl);
+            await playAudioData(await response.arrayBuffer(), agentName);
+        } catch (err) {
+            console.error('Audio download failed:', err);
+        }
+    }
+
+    async function playAudioData(audioData, agentName) {
+        if (!audioData || !audioContext) {
             return;
         }
 
@@ -401,15 +596,8 @@ document.addEventListener('DOMContentLoaded', () => {
             // Stop previous audio
             stopCurrentAudio();
 
-            // Decode base64 to ArrayBuffer
-            const binaryString = atob(audioBase64);
-            const bytes = new Uint8Array(binaryString.length);
-            for (let i = 0; i < binaryString.length; i++) {
-                bytes[i] = binaryString.charCodeAt(i);
-            }
-
             // Decode audio data
-            const audioBuffer = await audioContext.decodeAudioData(bytes.buffer);
+            const audioBuffer = await audioContext.decodeAudioData(audioData);
 
             // Create audio source
             const source = audioContext.createBufferSource();
@@ -457,6 +645,8 @@ document.addEventListener('DOMContentLoaded', () => {
 
         chatContainer.appendChild(messageDiv);
         chatContainer.scrollTop = chatContainer.scrollHeight;
+
+        return textNode;
     }
 
     function getAgentClass(agentName) {
@@ -483,25 +673,52 @@ document.addEventListener('DOMContentLoaded', () => {
         const agentsDisplay = document.getElementById('agents-display');
 
         agentsList.innerHTML = '';
+        agents.forEach(addAgentBadge);
 
-        agents.forEach(agent => {
-            const badge = document.createElement('div');
-            badge.classList.add('agent-badge');
+        agentsDisplay.classList.remove('hidden');
+    }
 
-            const nameSpan = document.createElement('span');
-            nameSpan.classList.add('agent-name');
-            nameSpan.textContent = agent.name;
+    function addAgentBadge(agent) {
+        const agentsList = document.getElementById('agents-list');
 
-            const roleSpan = document.createElement('span');
-            roleSpan.classList.add('agent-role');
-            roleSpan.textContent = agent.stance || agent.role || '';
+        const badge = document.createElement('div');
+        badge.classList.add('agent-badge');
 
-            badge.appendChild(nameSpan);
-            badge.appendChild(roleSpan);
-            agentsList.appendChild(badge);
-        });
+        const nameSpan = document.createElement('span');
+        nameSpan.classList.add('agent-name');
+        nameSpan.textContent = agent.name;
 
-        agentsDisplay.classList.remove('hidden');
+        const roleSpan = document.createElement('span');
+        roleSpan.classList.add('agent-role');
+        roleSpan.textContent = agent.stance || agent.role || '';
+
+        badge.appendChild(nameSpan);
+        badge.appendChild(roleSpan);
+        agentsList.appendChild(badge);
+    }
+
+    // Read a server-sent event stream from a fetch response, calling onEvent(event, data) per event
+    async function readServerEvents(response, onEvent) {
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder();
+        let buffer = '';
+        while (true) {
+            const { value, done } = await reader.read();
+            if (done) break;
+            buffer += decoder.decode(value, { stream: true });
+            let end;
+            while ((end = buffer.indexOf('\n\n')) !== -1) {
+                const block = buffer.slice(0, end);
+                buffer = buffer.slice(end + 2);
+                let event = 'message';
+                let data = '';
+                block.split('\n').forEach(line => {
+                    if (line.startsWith('event: ')) event = line.slice(7);
+                    else if (line.startsWith('data: ')) data += line.slice(6);
+                });
+                onEvent(event, data ? JSON.parse(data) : null);
+            }
+        }
     }
 
     // Voice Cloning Modal Functions
@@ -0,0 +1,19 @@
+"""
+Test setup: modules are imported from src/ like the app runs them, with
+databases, audio and caches in a temporary directory and a fake LLM
+"""
+import os
+import sys
+import pathlib
+import tempfile
+
+ROOT = pathlib.Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "src"))
+
+_data = pathlib.Path(tempfile.mkdtemp(prefix="brainstormer-tests-"))
+os.environ.setdefault("OPENAI_API_KEY", "sk-test")
+os.environ.setdefault("LLM_BACKEND", "fake")
+os.environ.setdefault("DATABASE_PATH", str(_data / "discussions.db"))
+os.environ.setdefault("AUDIO_STORE_DIR", str(_data / "audio_store"))
+os.environ.setdefault("TTS_CACHE_DIR", str(_data / "tts_cache"))
+os.environ.setdefault("LLM_CACHE_PATH", str(_data / "llm_cache.msgpack"))
@@ -0,0 +1,69 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from database import Discussion, Message, SessionLocal
+from main import app, audio_store, parse_range
+
+SIZE = 1000
+
+
+@pytest.mark.parametrize("header, expected", [
+    ("bytes=0-99", (0, 99)),
+    ("bytes=900-2000", (900, 999)),  # End clamped to the last byte
+    ("bytes=500-", (500, 999)),  # Open-ended
+    ("bytes=-100", (900, 999)),  # Suffix: last 100 bytes
+    ("bytes=-5000", (0, 999)),  # Suffix longer than the blob
+    ("bytes=999-999", (999, 999)),
+])
+def test_satisfiable_ranges(header, expected):
+    assert parse_range(header, SIZE) == expected
+
+
+@pytest.mark.parametrize("header", ["bytes=1000-", "bytes=1500-1600", "bytes=200-100", "bytes=-0"])
+def test_unsatisfiable_ranges(header):
+    assert parse_range(header, SIZE) == "unsatisfiable"
+
+
+@pytest.mark.parametrize("header", [None, "", "items=0-10", "bytes=0-10,20-30", "bytes=a-b", "bytes=-"])
+def test_ignored_ranges_serve_whole_body(header):
+    assert parse_range(header, SIZE) is None
+
+
+@pytest.fixture
+def audio_message():
+    audio = bytes(range(256)) * 4
+    db = SessionLocal()
+    try:
+        discussion = Discussion(topic="Range requests")
+        db.add(discussion)
+        db.commit()
+        message = Message(discussion_id=discussion.id, agent_name="Cyclist", content="(calm) Hi.")
+        message.audio_hash = audio_store.put(db, audio)
+        db.add(message)
+        db.commit()
+        yield f"/messages/{message.id}/audio", audio
+    finally:
+        db.close()
+
+
+def test_audio_endpoint_ranges(audio_message):
+    url, audio = audio_message
+    with TestClient(app) as client:
+        response = client.get(url)
+        assert response.status_code == 200
+        assert response.content == audio
+
+        response = client.get(url, headers={"Range": "bytes=-24"})
+        assert response.status_code == 206
+        assert response.headers["content-range"] == f"bytes 1000-1023/{len(audio)}"
+        assert response.content == audio[-24:]
+
+        response = client.get(url, headers={"Range": "bytes=1000-"})
+        assert response.content == audio[1000:]
+
+        response = client.get(url, headers={"Range": f"bytes={len(audio)}-"})
+        assert response.status_code == 416
+        assert response.headers["content-range"] == f"bytes */{len(audio)}"
+
+        response = client.get(url, headers={"If-None-Match": response.headers["etag"]})
+        assert response.status_code == 304
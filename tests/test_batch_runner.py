@@ -0,0 +1,36 @@
+import json
+import asyncio
+
+from batch_runner import ResultWriter, completed_ids
+
+
+def write(path, *records):
+    async def run():
+        writer = ResultWriter(path)
+        for record in records:
+            await writer.write(record)
+        writer.close()
+
+    asyncio.run(run())
+
+
+def test_resume_after_cut_off_line(tmp_path):
+    path = tmp_path / "out" / "discussions.jsonl"
+    write(path, {"id": "a", "status": "completed"})
+    with open(path, "a", encoding="utf-8") as f:
+        f.write('{"id": "b", "status": "compl')  # Interrupted mid-write
+
+    assert completed_ids(path) == {"a"}
+    write(path, {"id": "b", "status": "completed"}, {"id": "c", "status": "failed"})
+    assert completed_ids(path) == {"a", "b"}
+    assert json.loads(path.read_text(encoding="utf-8").splitlines()[-1])["id"] == "c"
+
+
+def test_new_and_complete_files_are_appended_as_is(tmp_path):
+    path = tmp_path / "discussions.jsonl"
+    write(path)
+    assert path.read_text() == ""
+    write(path, {"id": "a", "status": "completed"})
+    write(path, {"id": "b", "status": "completed"})
+    assert len(path.read_text().splitlines()) == 2
+    assert completed_ids(path) == {"a", "b"}
@@ -0,0 +1,56 @@
+import asyncio
+
+import pytest
+
+import role_cache as role_cache_module
+from database import SessionLocal, init_db
+from role_cache import RoleCache, normalize_topic
+from role_generator import FALLBACK_ROLES
+
+ROLES = [
+    {"name": f"Speaker_{i}", "system_message": f"You are speaker {i}."}
+    for i in range(3)
+]
+
+
+@pytest.fixture
+def db():
+    init_db()
+    session = SessionLocal()
+    yield session
+    session.close()
+
+
+def test_normalize_topic():
+    assert normalize_topic("  Should cities BAN cars?! ") == "should cities ban cars"
+
+
+def test_exact_and_similar_topics_hit(db):
+    cache = RoleCache(similarity=0.7)
+    assert cache.store(db, "Should cities ban cars in the centre?", 3, ROLES)
+    assert cache.lookup(db, "should cities ban cars in the centre", 3) == ROLES
+    assert cache.lookup(db, "Should cities ban cars in the center?", 3) == ROLES
+    assert cache.lookup(db, "Should cities ban cars in the centre?", 4) is None
+    assert cache.lookup(db, "Is remote work here to stay?", 3) is None
+    stats = cache.stats()
+    assert (stats["hits_exact"], stats["hits_similar"], stats["misses"]) == (1, 1, 2)
+
+
+@pytest.mark.parametrize("roles", [[], ROLES[:2], FALLBACK_ROLES])
+def test_incomplete_and_fallback_roles_are_not_stored(db, roles):
+    cache = RoleCache()
+    topic = f"Unstorable roles {len(roles)}"
+    assert not cache.store(db, topic, 3, roles)
+    assert cache.lookup(db, topic, 3) is None
+
+
+def test_empty_generation_is_retried(db, monkeypatch):
+    results = [[], ROLES]
+
+    async def generate(topic, num_roles=3):
+        return results.pop(0)
+
+    monkeypatch.setattr(role_cache_module, "generate_discussion_roles", generate)
+    cache = RoleCache()
+    assert asyncio.run(cache.get_roles(db, "Do empty replies stick?", 3)) == []
+    assert asyncio.run(cache.get_roles(db, "Do empty replies stick?", 3)) == ROLES
@@ -0,0 +1,65 @@
+import json
+import asyncio
+
+import pytest
+
+from llm import FakeBackend, set_backend
+from role_generator import FALLBACK_ROLES, RoleStreamParser, stream_discussion_roles
+
+ROLES = [
+    {"name": "Urban Planner", "stance": "Cars {mostly} out", "personality": "Calm \"data\" person"},
+    {"name": "Shop Owner", "stance": "Deliveries need roads [always]", "personality": "Blunt\\direct",
+     "extra": {"nested": ["kept", {"in": "role"}]}},
+    {"name": "Cyclist", "stance": "Ban now", "personality": "Impatient"}
+]
+DOCUMENT = json.dumps({"roles": ROLES}, indent=2)
+
+
+@pytest.fixture(autouse=True)
+def reset_backend():
+    yield
+    set_backend(None)
+
+
+def test_roles_yielded_as_each_object_closes():
+    parser = RoleStreamParser()
+    completed_at = []
+    roles = []
+    for i, char in enumerate(DOCUMENT):
+        for role in parser.feed(char):
+            roles.append(role)
+            completed_at.append(i)
+    assert roles == ROLES
+    # Each role is available before the document ends
+    assert completed_at[0] < completed_at[1] < completed_at[2] < len(DOCUMENT) - 1
+
+
+def test_braces_and_quotes_inside_strings_are_ignored():
+    parser = RoleStreamParser()
+    second_start = DOCUMENT.index('"Shop Owner"')
+    assert parser.feed(DOCUMENT[:second_start]) == [ROLES[0]]
+    assert parser.feed(DOCUMENT[second_start:]) == ROLES[1:]
+
+
+def test_other_layouts_yield_nothing():
+    parser = RoleStreamParser()
+    assert parser.feed(json.dumps([ROLES[0], ROLES[2]])) == []
+
+
+def collect(reply: str) -> list:
+    set_backend(FakeBackend(reply=lambda messages: reply, chunk_size=5))
+
+    async def run():
+        return [role async for role in stream_discussion_roles("Should cities ban cars?", num_roles=3)]
+
+    return asyncio.run(run())
+
+
+def test_stream_builds_agent_configs():
+    roles = collect(DOCUMENT)
+    assert [role["name"] for role in roles] == ["Urban_Planner", "Shop_Owner", "Cyclist"]
+    assert "Your stance: Ban now" in roles[2]["system_message"]
+
+
+def test_stream_falls_back_when_nothing_parses():
+    assert collect("not json") == FALLBACK_ROLES
@@ -0,0 +1,59 @@
+import asyncio
+
+import tts_handler
+from tts_handler import SentenceSplitter, generate_tts_chunks
+
+
+def split(deltas: list) -> list:
+    splitter = SentenceSplitter()
+    sentences = []
+    for delta in deltas:
+        sentences += splitter.feed(delta)
+    return sentences + splitter.flush()
+
+
+def test_sentences_complete_across_deltas():
+    assert split(["Hello th", "ere. How are ", "you?! Fine", "."]) == ["Hello there.", "How are you?!", "Fine."]
+
+
+def test_sentence_needs_following_whitespace():
+    splitter = SentenceSplitter()
+    assert splitter.feed("It costs 3.") == []
+    assert splitter.feed("5 euros. Cheap") == ["It costs 3.5 euros."]
+    assert splitter.flush() == ["Cheap"]
+
+
+def test_closing_quotes_stay_with_sentence():
+    assert split(['He said "no." Then ', "left."]) == ['He said "no."', "Then left."]
+
+
+def test_emotion_marker_split_across_deltas_prefixes_every_sentence():
+    splitter = SentenceSplitter()
+    assert splitter.feed("(exc") == []
+    assert splitter.feed("ited) One. Two") == ["(excited) One."]
+    assert splitter.flush() == ["(excited) Two"]
+
+
+def test_marker_only_at_start():
+    assert split(["Plain start. (sad) not a marker."]) == ["Plain start.", "(sad) not a marker."]
+
+
+def test_flush_of_short_reply_keeps_marker():
+    assert split(["(calm) ok"]) == ["(calm) ok"]
+    assert split(["  "]) == []
+
+
+def test_tts_chunks_in_order_with_failures(monkeypatch):
+    async def synthesize_speech(text, voice_id):
+        # Later sentences finish first
+        await asyncio.sleep(0.01 * (3 - len(text) % 3))
+        return None if text == "bad." else text.encode()
+
+    monkeypatch.setattr(tts_handler, "synthesize_speech", synthesize_speech)
+
+    async def collect():
+        return [chunk async for chunk in generate_tts_chunks(["a.", "bb.", "bad.", "dddd."], "voice", max_concurrency=2)]
+
+    assert asyncio.run(collect()) == [
+        (0, "a.", b"a."), (1, "bb.", b"bb."), (2, "bad.", None), (3, "dddd.", b"dddd.")
+    ]
@@ -0,0 +1,110 @@
+import time
+import asyncio
+
+from fastapi.testclient import TestClient
+
+from main import app, session_store
+from session_store import SessionStore
+
+
+class Sized:
+    def memory_bytes(self):
+        return 10
+
+
+def session() -> dict:
+    return {"agent_system": Sized(), "turn_lock": asyncio.Lock()}
+
+
+def test_capacity_evicts_least_recently_used():
+    evicted = []
+    store = SessionStore(capacity=2, idle_minutes=0, on_evict=evicted.append)
+    first, second, third = session(), session(), session()
+    store.put(1, first)
+    store.put(2, second)
+    store.get(1)  # Now 2 is the least recently used
+    store.put(3, third)
+    assert 2 not in store and 1 in store and 3 in store
+    assert evicted == [second]
+    assert store.stats()["evicted_lru"] == 1
+    assert store.memory_bytes() == 20
+
+
+def test_busy_sessions_are_not_evicted():
+    store = SessionStore(capacity=1, idle_minutes=1)
+    busy = session()
+    asyncio.run(busy["turn_lock"].acquire())
+    store.put(1, busy)
+    store.put(2, session())
+    # Over capacity until the turn ends, rather than dropping an in-flight session
+    assert 1 in store and len(store) == 1
+
+    busy["last_used"] = time.monotonic() - 120
+    assert store.evict_idle() == 0
+    busy["turn_lock"].release()
+    assert store.evict_idle() == 1
+    assert len(store) == 0
+
+
+def test_idle_eviction_and_replacement():
+    evicted = []
+    store = SessionStore(capacity=10, idle_minutes=1, on_evict=evicted.append)
+    old, fresh, replacement = session(), session(), session()
+    store.put(1, old)
+    store.put(2, fresh)
+    old["last_used"] = time.monotonic() - 120
+    assert store.evict_idle() == 1
+    assert 1 not in store and evicted == [old]
+
+    store.put(2, replacement)
+    assert evicted == [old, fresh]
+    assert store.pop(2) is replacement
+    assert evicted == [old, fresh]  # Popped sessions are the caller's to clean up
+
+
+def test_idle_eviction_disabled():
+    store = SessionStore(capacity=10, idle_minutes=0)
+    store.put(1, session())
+    store.get(1)["last_used"] = 0
+    assert store.evict_idle() == 0
+
+
+def history(discussion_id: int) -> list:
+    agent_system = session_store.get(discussion_id)["agent_system"]
+    return [(msg["agent"], msg["content"]) for msg in agent_system.discussion_history[1:]]
+
+
+def test_evicted_session_is_rebuilt_from_database():
+    with TestClient(app) as client:
+        discussion_id = client.post("/discussions", json={"topic": "Should cities ban cars?"}).json()["id"]
+        assert client.post(f"/discussions/{discussion_id}/init").status_code == 200
+        assert client.post(f"/discussions/{discussion_id}/mode", json={"mode": "round_robin"}).status_code == 200
+        client.post(f"/discussions/{discussion_id}/next_turn")
+        client.post(f"/discussions/{discussion_id}/user_message", json={"content": "@Cyclist really?"})
+        client.post(f"/discussions/{discussion_id}/next_turn")
+
+        before = history(discussion_id)
+        assert len(before) == 3
+        live = session_store.get(discussion_id)
+        turns = live["agent_system"].current_turn
+        prefetch = live["prefetch"]
+
+        live["last_used"] = time.monotonic() - 10 * session_store.idle_seconds
+        restored = session_store.restored
+        assert session_store.evict_idle() == 1
+        assert discussion_id not in session_store
+
+        # Nothing keeps computing for the dropped session
+        client.portal.call(asyncio.sleep, 0)
+        assert prefetch.cancelled() or prefetch.done()
+
+        messages = client.get(f"/discussions/{discussion_id}/messages").json()
+        response = client.post(f"/discussions/{discussion_id}/next_turn")
+        assert response.status_code == 200
+        assert session_store.restored == restored + 1
+
+        rebuilt = session_store.get(discussion_id)["agent_system"]
+        assert rebuilt.discussion_mode == "round_robin"
+        assert rebuilt.current_turn == turns + 1
+        assert history(discussion_id)[:len(before)] == before
+        assert [(m["agent_name"], m["content"]) for m in messages] == before
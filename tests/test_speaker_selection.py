@@ -0,0 +1,56 @@
+import pytest
+
+from agents import MultiAgentDiscussion
+
+ROLES = [
+    {"name": "Urban_Planner", "system_message": "You plan cities."},
+    {"name": "Shop_Owner", "system_message": "You run a shop."},
+    {"name": "Cyclist", "system_message": "You ride bikes."}
+]
+
+
+def select(*messages) -> tuple:
+    discussion = MultiAgentDiscussion(custom_roles=ROLES)
+    discussion.init_discussion("Should cities ban cars?")
+    discussion.restore_history(list(messages))
+    agent, path = discussion._heuristic_speaker()
+    return (agent.name if agent else None), path
+
+
+@pytest.mark.parametrize("content, expected", [
+    ("(angry) @Urban Planner that is naive.", "Urban_Planner"),
+    ("(calm) @Shop_Owner, what do you think?", "Shop_Owner"),
+    ("(calm) @[Shop Owner] what do you think?", "Shop_Owner"),
+    ("(happy) As I said, @Cyclist here thinks @Urban_Planner is right.", "Urban_Planner"),  # Own name skipped
+])
+def test_mention_answers(content, expected):
+    assert select(("Shop_Owner", "(calm) Deliveries."), ("Cyclist", content)) == (expected, "mention")
+
+
+def test_unknown_mention_falls_through_to_balance():
+    assert select(
+        ("Urban_Planner", "(calm) Trams."), ("Shop_Owner", "(calm) Vans."), ("Urban_Planner", "(calm) @Nobody hi.")
+    ) == ("Cyclist", "balance")
+
+
+def test_user_gets_answered_by_least_recent_speaker():
+    assert select(
+        ("Shop_Owner", "(calm) Vans."), ("Urban_Planner", "(calm) Trams."),
+        ("Cyclist", "(calm) Bikes."), ("You", "What about buses?")
+    ) == ("Shop_Owner", "user_reply")
+
+
+def test_user_reply_is_ambiguous_when_nobody_spoke():
+    assert select(("You", "Go ahead.")) == (None, None)
+
+
+def test_least_frequent_speaker_then_least_recent():
+    assert select(
+        ("Urban_Planner", "(calm) Trams."), ("Shop_Owner", "(calm) Vans."),
+        ("Cyclist", "(calm) Bikes."), ("Urban_Planner", "(calm) More trams.")
+    ) == ("Shop_Owner", "balance")
+
+
+def test_tie_is_left_to_the_llm():
+    assert select() == (None, None)
+    assert select(("Urban_Planner", "(calm) Trams.")) == (None, None)
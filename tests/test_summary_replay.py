@@ -0,0 +1,59 @@
+import asyncio
+
+import pytest
+
+import agents
+from agents import MultiAgentDiscussion
+from llm import FakeBackend, RecordReplayBackend, set_backend
+
+TURNS = 16
+
+
+class SlowSummaryBackend(FakeBackend):
+    """Fake LLM whose summary updates take longer than several turns"""
+
+    def __init__(self, summary_latency: float):
+        super().__init__(reply=lambda messages: f"(calm) Point {len(messages[-1]['content'])}.")
+        self.summary_latency = summary_latency
+
+    async def complete(self, messages, temperature=0.7, max_tokens=None, response_format=None):
+        if "Update the summary so far" in messages[-1]["content"]:
+            await asyncio.sleep(self.summary_latency)
+        return await super().complete(messages, temperature, max_tokens, response_format)
+
+
+@pytest.fixture(autouse=True)
+def small_window(monkeypatch):
+    monkeypatch.setattr(agents, "HISTORY_WINDOW", 3)
+    monkeypatch.setattr(agents, "SUMMARY_BATCH", 2)
+    yield
+    set_backend(None)
+
+
+async def run_discussion(backend) -> list:
+    set_backend(backend)
+    discussion = MultiAgentDiscussion(discussion_mode="round_robin")
+    discussion.init_discussion("Should cities ban cars?")
+    transcript = []
+    for turn in range(TURNS):
+        if turn == 5:
+            discussion.add_user_message("@Philosopher what about deliveries?")
+        transcript.append(await discussion.next_turn())
+    if discussion._summary_task:
+        # Let the last update finish so both runs make the same calls
+        await discussion._summary_task
+    transcript.append(discussion.summary)
+    return transcript
+
+
+def test_replay_matches_recording_with_slow_summarizer(tmp_path):
+    path = tmp_path / "llm.msgpack"
+    recorder = RecordReplayBackend(SlowSummaryBackend(summary_latency=0.05), path, "record")
+    recorded = asyncio.run(run_discussion(recorder))
+    assert recorded[-1], "summary was never applied"
+
+    # Replay serves summaries instantly: prompts must not depend on that
+    replayer = RecordReplayBackend(SlowSummaryBackend(summary_latency=0), path, "replay")
+    replayed = asyncio.run(run_discussion(replayer))
+    assert replayed == recorded
+    assert replayer.misses == 0
@@ -0,0 +1,56 @@
+from tts_cache import TTSCache
+
+SETTINGS = {"model": "s1", "latency": "balanced"}
+
+
+def test_key_ignores_whitespace_differences():
+    assert TTSCache.make_key("v", "Hello  there.\n", SETTINGS) == TTSCache.make_key("v", "Hello there.", SETTINGS)
+    assert TTSCache.make_key("v", "Hello there.", SETTINGS) != TTSCache.make_key("w", "Hello there.", SETTINGS)
+    assert TTSCache.make_key("v", "Hello there.", SETTINGS) != TTSCache.make_key("v", "Hello there.", {"model": "s2"})
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    cache = TTSCache(str(tmp_path), max_bytes=30)
+    cache.put("a" * 64, b"a" * 10)
+    cache.put("b" * 64, b"b" * 10)
+    cache.put("c" * 64, b"c" * 10)
+    assert cache.get("a" * 64) == b"a" * 10  # Now b is the least recently used
+
+    cache.put("d" * 64, b"d" * 10)
+    assert cache.get("b" * 64) is None
+    assert cache.get("a" * 64) == b"a" * 10
+    assert not (tmp_path / "bb" / f"{'b' * 64}.mp3").exists()
+
+    stats = cache.stats()
+    assert stats["entries"] == 3 and stats["bytes"] == 30
+    assert stats["evictions"] == 1
+    assert (stats["hits"], stats["misses"]) == (2, 1)
+
+
+def test_replacing_an_entry_updates_its_size(tmp_path):
+    cache = TTSCache(str(tmp_path), max_bytes=100)
+    cache.put("a" * 64, b"x" * 40)
+    cache.put("a" * 64, b"y" * 20)
+    assert cache.stats()["bytes"] == 20
+    assert cache.get("a" * 64) == b"y" * 20
+
+
+def test_entries_larger_than_the_cache_are_not_stored(tmp_path):
+    cache = TTSCache(str(tmp_path), max_bytes=10)
+    cache.put("a" * 64, b"x" * 11)
+    assert cache.stats()["entries"] == 0
+
+
+def test_index_survives_restart(tmp_path):
+    cache = TTSCache(str(tmp_path), max_bytes=100)
+    cache.put("a" * 64, b"audio")
+    reopened = TTSCache(str(tmp_path), max_bytes=100)
+    assert reopened.get("a" * 64) == b"audio"
+    assert reopened.stats()["bytes"] == 5
+
+
+def test_disabled_cache(tmp_path):
+    cache = TTSCache(str(tmp_path / "off"), max_bytes=0)
+    cache.put("a" * 64, b"audio")
+    assert cache.get("a" * 64) is None
+    assert not (tmp_path / "off").exists()
@@ -0,0 +1,64 @@
+import asyncio
+
+import pytest
+
+from agents import MultiAgentDiscussion, turn_stats
+from llm import FakeBackend, set_backend
+
+
+@pytest.fixture(autouse=True)
+def fake_backend():
+    set_backend(FakeBackend(reply=lambda messages: "(calm) One point. Another point."))
+    yield
+    set_backend(None)
+
+
+def counters(mode: str) -> dict:
+    return dict(turn_stats.get(mode, {"turns": 0, "streamed": 0, "calls": 0, "discarded": 0}))
+
+
+async def stream_turn(discussion: MultiAgentDiscussion) -> list:
+    return [event async for event in discussion.stream_next_turn()]
+
+
+@pytest.mark.parametrize("mode", ["auto", "round_robin", "combined", "parallel"])
+def test_streamed_turn_completes_and_is_counted(mode):
+    discussion = MultiAgentDiscussion(discussion_mode=mode)
+    discussion.init_discussion("Should cities ban cars?")
+    before = counters(mode)
+
+    events = asyncio.run(stream_turn(discussion))
+    assert events[0][0] == "speaker"
+    content = "".join(value for kind, value in events if kind == "token")
+    assert content == "(calm) One point. Another point."
+    # Recorded only once the caller commits it
+    assert discussion.current_turn == 0
+    assert counters(mode)["turns"] == before["turns"]
+
+    discussion.commit_turn(events[0][1], content)
+    assert discussion.current_turn == 1
+    assert discussion.discussion_history[-1]["agent"] == events[0][1]
+
+    after = counters(mode)
+    assert after["turns"] == before["turns"] + 1
+    assert after["calls"] > before["calls"]
+    if mode in ("auto", "round_robin"):
+        assert after["streamed"] == before["streamed"] + 1
+
+
+def test_discarded_prepared_turn_is_not_counted_as_a_turn():
+    discussion = MultiAgentDiscussion(discussion_mode="round_robin")
+    discussion.init_discussion("Should cities ban cars?")
+    before = counters("round_robin")
+
+    async def run():
+        await discussion.prepare_turn()  # Speculative turn, made stale by the user
+        discussion.add_user_message("What about deliveries?")
+        agent_name, response = await discussion.prepare_turn()
+        discussion.commit_turn(agent_name, response)
+
+    asyncio.run(run())
+    after = counters("round_robin")
+    assert after["turns"] == before["turns"] + 1
+    assert after["discarded"] == before["discarded"] + 1
+    assert after["calls"] == before["calls"] + 1
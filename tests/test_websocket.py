@@ -0,0 +1,97 @@
+import time
+
+from fastapi.testclient import TestClient
+
+import main
+from database import Message, SessionLocal
+from llm import FakeBackend, set_backend
+from main import app, session_store
+
+
+def receive_turn(websocket) -> list:
+    events = []
+    while True:
+        event = websocket.receive_json()
+        events.append(event)
+        if event["type"] in ("done", "finished", "error"):
+            return events
+
+
+def test_streamed_turn_over_websocket():
+    with TestClient(app) as client:
+        discussion_id = client.post("/discussions", json={"topic": "Should cities ban cars?"}).json()["id"]
+        assert client.post(f"/discussions/{discussion_id}/init").status_code == 200
+        # Drop the session and its speculative first turn, so the turn is streamed from a rebuilt session
+        session_store.pop(discussion_id)["prefetch"].cancel()
+
+        with client.websocket_connect(f"/ws/discussions/{discussion_id}") as websocket:
+            websocket.send_json({"action": "next_turn"})
+            events = receive_turn(websocket)
+
+            types = [event["type"] for event in events]
+            assert types[0] == "speaker"
+            assert types[-2:] == ["audio", "done"]
+            tokens = [event["delta"] for event in events if event["type"] == "token"]
+            assert len(tokens) > 1 and set(types[1:-2]) == {"token"}
+
+            done = events[-1]
+            assert done["agent"] == events[0]["agent"]
+            assert done["content"] == "".join(tokens)
+
+            websocket.send_text("not json")
+            assert websocket.receive_json() == {"type": "error", "detail": "Invalid JSON"}
+
+        db = SessionLocal()
+        try:
+            message = db.get(Message, done["message_id"])
+            assert (message.discussion_id, message.agent_name, message.content) == (discussion_id, done["agent"], done["content"])
+        finally:
+            db.close()
+
+        agent_system = session_store.get(discussion_id)["agent_system"]
+        assert agent_system.current_turn == 1
+        assert agent_system.discussion_history[-1]["content"] == done["content"]
+
+
+def test_turn_not_saved_is_not_added_to_history(monkeypatch):
+    with TestClient(app) as client:
+        discussion_id = client.post("/discussions", json={"topic": "Should cities ban cars?"}).json()["id"]
+        assert client.post(f"/discussions/{discussion_id}/init").status_code == 200
+        session_store.pop(discussion_id)["prefetch"].cancel()
+
+        def failing_commit(db):
+            raise RuntimeError("database is locked")
+
+        with client.websocket_connect(f"/ws/discussions/{discussion_id}") as websocket:
+            monkeypatch.setattr(main, "commit", failing_commit)
+            websocket.send_json({"action": "next_turn"})
+            events = receive_turn(websocket)
+            assert events[-1] == {"type": "error", "detail": "database is locked"}
+
+        assert session_store.get(discussion_id)["agent_system"].current_turn == 0
+
+
+def test_prefetch_is_used_only_when_complete():
+    with TestClient(app) as client:
+        set_backend(FakeBackend(latency=0.3))
+        try:
+            discussion_id = client.post("/discussions", json={"topic": "Should cities ban cars?"}).json()["id"]
+            assert client.post(f"/discussions/{discussion_id}/init").status_code == 200
+            first_prefetch = session_store.get(discussion_id)["prefetch"]
+
+            with client.websocket_connect(f"/ws/discussions/{discussion_id}") as websocket:
+                # Asked while the first turn is still being generated: streamed
+                websocket.send_json({"action": "next_turn"})
+                events = receive_turn(websocket)
+                assert events[-1]["type"] == "done"
+                assert first_prefetch.cancelled()
+                assert len([event for event in events if event["type"] == "token"]) > 1
+
+                # Asked once the next turn is ready: sent in one piece
+                time.sleep(1)
+                websocket.send_json({"action": "next_turn"})
+                events = receive_turn(websocket)
+                assert events[-1]["type"] == "done"
+                assert [event["type"] for event in events] == ["speaker", "token", "audio", "done"]
+        finally:
+            set_backend(None)
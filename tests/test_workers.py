@@ -0,0 +1,50 @@
+import time
+import asyncio
+import threading
+
+from workers import WorkerPool
+
+
+def test_counters_after_success_and_failure():
+    pool = WorkerPool(max_workers=2)
+
+    def fail():
+        raise ValueError("boom")
+
+    async def run():
+        assert await pool.run(sum, [1, 2, 3]) == 6
+        try:
+            await pool.run(fail)
+        except ValueError:
+            pass
+
+    asyncio.run(run())
+    pool.shutdown()
+    stats = pool.stats()
+    assert (stats["completed"], stats["failed"], stats["active"], stats["queued"]) == (1, 1, 0, 0)
+
+
+def test_cancelled_queued_call_is_not_left_queued():
+    pool = WorkerPool(max_workers=1)
+    release = threading.Event()
+    ran = []
+
+    async def run():
+        blocker = asyncio.create_task(pool.run(release.wait))
+        await asyncio.sleep(0.05)
+        waiting = asyncio.create_task(pool.run(ran.append, "queued call"))
+        await asyncio.sleep(0.05)
+        assert pool.stats()["queued"] == 1
+
+        # Like a discarded prefetch: the awaiting task goes away before a thread is free
+        waiting.cancel()
+        await asyncio.sleep(0.05)
+        release.set()
+        await blocker
+
+    asyncio.run(run())
+    time.sleep(0.05)
+    pool.shutdown()
+    stats = pool.stats()
+    assert ran == []
+    assert (stats["queued"], stats["active"], stats["cancelled"], stats["completed"]) == (0, 0, 1, 1)